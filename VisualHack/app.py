@@ -1,30 +1,65 @@
+import time
+page_started = time.perf_counter()
+
 import streamlit as st
-import os
 import sys
+from utils import get_environment, get_cgroups, page_startup
 
 st.set_page_config(
-    page_title="Kali Attack Dashboard", 
-    page_icon="💀", 
+    page_title="Kali Attack Dashboard",
+    page_icon="💀",
     layout="wide"
 )
 
 st.title("💀 Automated Attack Dashboard")
 st.markdown("---")
 
+env = get_environment()
+page_startup("Dashboard", page_started)
+
 col1, col2 = st.columns(2)
 
 with col1:
     st.write("### Status Panel")
     # Check Root Privileges
-    if os.geteuid() != 0:
+    if not env.is_root():
         st.error("⚠️ Root privileges missing! Run with `sudo streamlit run app.py`")
     else:
         st.success("✅ Running as Root (Privileged)")
 
     # Check Python Version
     st.info(f"🐍 Python Environment: {sys.version.split()[0]}")
+    st.info(f"📍 Local IP: {env.local_ip()}")
+
+    cgroups = get_cgroups()
+    if cgroups.available:
+        st.success(f"🧱 Tools run in their own cgroups under `{cgroups.jobs_dir}`")
+    else:
+        st.warning(f"🧱 Tools run without resource limits: {cgroups.reason}")
+
+    with st.expander("🧰 Tools & Interfaces"):
+        tools = env.snapshot()["tools"]
+        st.dataframe(
+            [{"Tool": tool, "Found": "✅" if path else "❌", "Path": path or ""} for tool, path in tools.items()],
+            hide_index=True, use_container_width=True
+        )
+        st.dataframe(
+            [{"Interface": name, "Wireless": "📶" if info["wireless"] else "", "State": "up" if info["up"] else "down"}
+             for name, info in env.interfaces().items()],
+            hide_index=True, use_container_width=True
+        )
+        st.caption(f"Checks are cached for {env.ttl:.0f}s across all pages and sessions.")
+        if st.button("🔄 Re-check now"):
+            env.refresh()
+            st.rerun()
 
 with col2:
     st.write("### Instructions")
     st.info("👈 Select a module from the sidebar to start an operation.")
     st.warning("Only use this tool on systems you have explicit permission to test.")
+
+    st.write("### ⏱️ Page Startup Times")
+    st.caption("Time each page spends on imports and environment checks per rerun, since the dashboard started.")
+    stats = env.startup_stats()
+    if stats:
+        st.dataframe(stats, hide_index=True, use_container_width=True)
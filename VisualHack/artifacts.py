@@ -0,0 +1,324 @@
+import contextlib
+import gzip
+import hashlib
+import io
+import os
+import re
+import shutil
+import sqlite3
+import threading
+import time
+
+from runner import LOG_DIR
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Persistent state lives outside /tmp so it survives a reboot
+DATA_DIR = os.environ.get("VISUALHACK_DATA", os.path.join(os.path.expanduser("~"), ".visualhack"))
+ARTIFACT_DIR = os.path.join(DATA_DIR, "artifacts")
+MANIFEST_PATH = os.path.join(DATA_DIR, "artifacts.db")
+
+# Total disk budget for artifacts, least recently used runs are evicted beyond it
+QUOTA_BYTES = int(os.environ.get("VISUALHACK_ARTIFACT_QUOTA_MB", 2048)) * 2**20
+
+# Runs touched more recently than this are never evicted, a tool may still be writing
+EVICT_MIN_AGE = 600
+
+# Spilled logs the RunStore has archived are removed once they haven't changed for this long,
+# at startup every spill that old goes, its run belonged to an earlier server process
+SPILL_MAX_AGE = 6 * 3600
+
+# LOG_DIR is rescanned at most this often, the spills grow on their own between saves
+SPILL_SCAN_INTERVAL = 60
+
+# Text artifacts get compressed, binary captures are kept as the tools wrote them
+TEXT_SUFFIXES = (".txt", ".csv", ".json", ".log", ".xml", ".nmap")
+COMPRESSED_SUFFIX = ".zst" if zstandard else ".gz"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS artifacts (
+    path         TEXT PRIMARY KEY,
+    run_dir      TEXT NOT NULL,
+    label        TEXT NOT NULL,
+    name         TEXT NOT NULL,
+    size         INTEGER,
+    created_at   REAL NOT NULL,
+    accessed_at  REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS artifacts_run ON artifacts (run_dir);
+CREATE INDEX IF NOT EXISTS artifacts_label ON artifacts (label, created_at);
+"""
+
+
+def open_compressed(path, mode="rt"):
+    """Opens a file written by the store, decompressing .zst/.gz transparently."""
+    text = "t" in mode
+    raw_mode = mode.replace("t", "").replace("b", "") + "b"
+    if path.endswith(".zst"):
+        if zstandard is None:
+            raise RuntimeError("Reading .zst artifacts needs the 'zstandard' package")
+        raw = open(path, raw_mode)
+        if "r" in raw_mode:
+            stream = zstandard.ZstdDecompressor().stream_reader(raw, closefd=True)
+        else:
+            stream = zstandard.ZstdCompressor(level=6).stream_writer(raw, closefd=True)
+        return _as_text(stream) if text else stream
+    if path.endswith(".gz"):
+        return gzip.open(path, mode, encoding="utf-8", errors="replace") if text else gzip.open(path, raw_mode, compresslevel=6)
+    return open(path, mode, encoding="utf-8", errors="replace") if text else open(path, raw_mode)
+
+
+def _as_text(stream):
+    return io.TextIOWrapper(stream, encoding="utf-8", errors="replace")
+
+
+# Content hashes shared by the report cache and the pcap analysis cache
+_digests = {}
+_digests_lock = threading.Lock()
+
+
+def file_digest(path):
+    """blake2b of a file as stored, remembered per (path, size, mtime) so unchanged files are hashed once."""
+    stat = os.stat(path)
+    key = (path, stat.st_size, stat.st_mtime_ns)
+    with _digests_lock:
+        if key in _digests:
+            return _digests[key]
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(2**20), b""):
+            digest.update(block)
+    with _digests_lock:
+        _digests[key] = digest.hexdigest()
+    return _digests[key]
+
+
+class ArtifactStore:
+    """
+    One place for every file the modules produce.
+
+    Each run gets its own directory under `root`, named after a label such as
+    "wifi_scan" or "nmap". Every file is listed in a SQLite manifest with its
+    size and last access time, so disk usage and lookups never need a
+    directory walk. Text artifacts are compressed, and whole runs are evicted
+    least recently used first once the quota is exceeded. The live logs
+    ProcessRunner spills to `log_dir` count against the same quota.
+
+    Args:
+        root (str): Directory holding the per-run directories.
+        manifest_path (str): SQLite manifest location.
+        quota_bytes (int): Disk budget for all runs and spilled logs together.
+        log_dir (str): Where ProcessRunner spills live logs.
+    """
+
+    def __init__(self, root=ARTIFACT_DIR, manifest_path=MANIFEST_PATH, quota_bytes=QUOTA_BYTES, log_dir=LOG_DIR):
+        self.root = root
+        self.manifest_path = manifest_path
+        self.quota_bytes = quota_bytes
+        self.log_dir = log_dir
+        self._lock = threading.Lock()
+        self._spills = []
+        self._spills_scanned = None
+        self._archived_spills = set()
+        os.makedirs(root, exist_ok=True)
+        with contextlib.closing(self._connect()) as conn, conn:
+            conn.executescript(SCHEMA)
+        self._scan_spills(startup=True)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.manifest_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    # --- WRITING ---
+    def new_run(self, label):
+        """Creates and returns a fresh directory for one run of a module."""
+        safe = re.sub(r"[^A-Za-z0-9_.-]+", "_", label)
+        stamp = time.strftime("%Y%m%d_%H%M%S")
+        run_dir = os.path.join(self.root, f"{stamp}-{safe}-{os.urandom(3).hex()}")
+        os.makedirs(run_dir)
+        return run_dir
+
+    def path(self, run_dir, name):
+        """
+        Returns where a tool should write `name` inside `run_dir` and lists it in the manifest.
+        Its size is picked up later, once the tool has written it.
+        """
+        path = os.path.join(run_dir, name)
+        self._record(path, size=None)
+        return path
+
+    def save_text(self, run_dir, name, text):
+        """Writes a text artifact compressed and returns its path."""
+        path = os.path.join(run_dir, name + COMPRESSED_SUFFIX)
+        with open_compressed(path, "wt") as f:
+            f.write(text)
+        self._record(path, os.path.getsize(path))
+        self.enforce_quota()
+        return path
+
+    def import_file(self, run_dir, name, source, compress=True):
+        """Copies `source` into the run, compressing it on the way if it is text."""
+        path = self._copy_in(run_dir, name, source, compress)
+        self.enforce_quota()
+        return path
+
+    def _copy_in(self, run_dir, name, source, compress):
+        compress = compress and name.endswith(TEXT_SUFFIXES)
+        path = os.path.join(run_dir, name + (COMPRESSED_SUFFIX if compress else ""))
+        with open(source, "rb") as src, (open_compressed(path, "wb") if compress else open(path, "wb")) as dst:
+            shutil.copyfileobj(src, dst, 2**20)
+        self._record(path, os.path.getsize(path))
+        return path
+
+    def compress(self, path):
+        """Compresses a text artifact a tool has finished writing, returns the new path."""
+        if not path.endswith(TEXT_SUFFIXES) or not os.path.exists(path):
+            self.refresh(path)
+            return path
+        run_dir, name = os.path.split(path)
+        new_path = self._copy_in(run_dir, name, path, compress=True)
+        os.remove(path)
+        with contextlib.closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM artifacts WHERE path = ?", (path,))
+        self.enforce_quota()
+        return new_path
+
+    def refresh(self, path):
+        """Updates the recorded size of an artifact a tool wrote in place."""
+        if os.path.exists(path):
+            self._record(path, os.path.getsize(path))
+        self.enforce_quota()
+
+    def _record(self, path, size):
+        run_dir, name = os.path.split(path)
+        label = os.path.basename(run_dir).split("-", 1)[-1].rsplit("-", 1)[0]
+        now = time.time()
+        with contextlib.closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT INTO artifacts (path, run_dir, label, name, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(path) DO UPDATE SET size = excluded.size, accessed_at = excluded.accessed_at",
+                (path, run_dir, label, name, size, now, now),
+            )
+
+    # --- READING ---
+    def open_text(self, path):
+        """Opens a text artifact for reading and marks its run as recently used."""
+        self.touch(path)
+        return open_compressed(path, "rt")
+
+    def touch(self, path):
+        with contextlib.closing(self._connect()) as conn, conn:
+            conn.execute("UPDATE artifacts SET accessed_at = ? WHERE run_dir = ?", (time.time(), os.path.dirname(path)))
+
+    def latest_run(self, label):
+        """Returns the newest run directory with this label that still exists, or None."""
+        with contextlib.closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT run_dir FROM artifacts WHERE label = ? ORDER BY created_at DESC LIMIT 1", (label,)
+            ).fetchone()
+        return row["run_dir"] if row and os.path.isdir(row["run_dir"]) else None
+
+    def files(self, run_dir=None, label=None, since=None, until=None):
+        """Lists manifest entries, newest first, optionally for one run or label and created between `since` and `until`."""
+        clauses, params = [], []
+        if run_dir:
+            clauses.append("run_dir = ?")
+            params.append(run_dir)
+        elif label:
+            clauses.append("label = ?")
+            params.append(label)
+        if since is not None:
+            clauses.append("created_at >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("created_at < ?")
+            params.append(until)
+        sql = "SELECT * FROM artifacts"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        with contextlib.closing(self._connect()) as conn:
+            return [dict(r) for r in conn.execute(sql + " ORDER BY created_at DESC", params)]
+
+    def usage(self):
+        with contextlib.closing(self._connect()) as conn:
+            return conn.execute("SELECT COALESCE(SUM(size), 0) FROM artifacts").fetchone()[0] + self._spill_bytes()
+
+    # --- EVICTION ---
+    def enforce_quota(self):
+        """
+        Evicts least recently used runs, then the oldest finished spilled logs, until the store fits its quota.
+        Returns the evicted run directories.
+        """
+        evicted = []
+        with self._lock, contextlib.closing(self._connect()) as conn, conn:
+            if time.monotonic() - self._spills_scanned > SPILL_SCAN_INTERVAL:
+                self._scan_spills()
+
+            # Files still being written by a tool have no size yet, stat just those
+            for row in conn.execute("SELECT path FROM artifacts WHERE size IS NULL").fetchall():
+                if os.path.exists(row["path"]):
+                    conn.execute("UPDATE artifacts SET size = ? WHERE path = ?", (os.path.getsize(row["path"]), row["path"]))
+
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM artifacts").fetchone()[0] + self._spill_bytes()
+            if total > self.quota_bytes:
+                runs = conn.execute(
+                    "SELECT run_dir, SUM(COALESCE(size, 0)) AS size, MAX(accessed_at) AS last_used "
+                    "FROM artifacts GROUP BY run_dir ORDER BY last_used"
+                ).fetchall()
+                for run in runs:
+                    if total <= self.quota_bytes:
+                        break
+                    if time.time() - run["last_used"] < EVICT_MIN_AGE:
+                        continue
+                    shutil.rmtree(run["run_dir"], ignore_errors=True)
+                    conn.execute("DELETE FROM artifacts WHERE run_dir = ?", (run["run_dir"],))
+                    total -= run["size"]
+                    evicted.append(run["run_dir"])
+
+            # Only spills the RunStore has archived can go, live runs still write to theirs
+            for spill in list(self._spills):
+                if total <= self.quota_bytes:
+                    break
+                if spill[2] not in self._archived_spills:
+                    continue
+                self._remove_spill(spill[2])
+                total -= spill[1]
+        return evicted
+
+    def spill_archived(self, path):
+        """Marks a spilled log whose run has ended and whose copy is in the store, so it may be evicted."""
+        self._archived_spills.add(path)
+
+    def _spill_bytes(self):
+        return sum(size for _, size, _ in self._spills)
+
+    def _scan_spills(self, startup=False):
+        # Removes old archived spills and keeps (mtime, size, path) of the rest, oldest first
+        cutoff = time.time() - SPILL_MAX_AGE
+        spills = []
+        if os.path.isdir(self.log_dir):
+            with os.scandir(self.log_dir) as entries:
+                for entry in entries:
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    if stat.st_mtime < cutoff and (startup or entry.path in self._archived_spills):
+                        self._remove_spill(entry.path)
+                    else:
+                        spills.append((stat.st_mtime, stat.st_size, entry.path))
+        self._spills = sorted(spills)
+        self._spills_scanned = time.monotonic()
+
+    def _remove_spill(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        self._spills = [spill for spill in self._spills if spill[2] != path]
+        self._archived_spills.discard(path)
@@ -0,0 +1,264 @@
+"""
+Benchmark cases: which page to open, which fake-tool scenario to use and
+which widgets to drive. Each case runs in its own process (see run.py).
+"""
+import contextlib
+import json
+import os
+import socket
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from streamlit.testing.v1 import AppTest
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Idle reruns measured per case after the first load
+IDLE_RERUNS = 5
+
+
+class CaseFailed(Exception):
+    pass
+
+
+class Driver:
+    """
+    Runs one page through AppTest and times every script run.
+
+    Args:
+        page (str): Script path relative to the app directory.
+        timeout (float): Longest a single script run may take.
+    """
+
+    def __init__(self, page, timeout):
+        self.at = AppTest.from_file(os.path.join(APP_DIR, page), default_timeout=timeout)
+        self.timings = []
+
+    def run(self, label="rerun"):
+        start = time.perf_counter()
+        self.at.run()
+        self.timings.append((label, time.perf_counter() - start))
+        if self.at.exception:
+            raise CaseFailed(f"{label}: {self.at.exception[0].value}")
+        return self.at
+
+    def button(self, label):
+        for button in self.at.button:
+            if button.label == label:
+                return button
+        raise CaseFailed(f"No button '{label}'")
+
+    def click(self, label):
+        self.button(label).click()
+        return self.run("action")
+
+    def set_text(self, label, value):
+        for widget in list(self.at.text_input) + list(self.at.sidebar.text_input):
+            if widget.label == label:
+                widget.set_value(value)
+                return
+        raise CaseFailed(f"No text input '{label}'")
+
+    def set_number(self, label, value):
+        for widget in self.at.number_input:
+            if widget.label == label:
+                widget.set_value(value)
+                return
+        raise CaseFailed(f"No number input '{label}'")
+
+    def wait_background(self, key, timeout=60):
+        """Reruns the page, like the monitor fragment would, until the background run `key` is done."""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            runner = self.at.session_state["background_runs"][key] if "background_runs" in self.at.session_state else None
+            if runner is not None and runner.done:
+                return self.run("action")
+            time.sleep(0.25)
+            self.run("poll")
+        raise CaseFailed(f"Background run '{key}' did not finish within {timeout}s")
+
+    def wait_for(self, kind, text, timeout=30):
+        """Reruns the page until an element of `kind` contains `text`."""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            try:
+                return self.expect(kind, text)
+            except CaseFailed:
+                time.sleep(0.25)
+                self.run("poll")
+        raise CaseFailed(f"No {kind} containing '{text}' within {timeout}s")
+
+    def expect(self, kind, text):
+        """Fails unless an element of `kind` (success, error, dataframe, code...) contains `text`."""
+        for element in getattr(self.at, kind):
+            value = getattr(element, "value", "")
+            if text in str(value):
+                return
+        raise CaseFailed(f"No {kind} containing '{text}'")
+
+
+# --- LOCAL TARGETS ---
+# Files the lab's web backend would serve, for the HTTP modules
+BACKEND_FILES = {
+    "/system_logs.json": json.dumps({"logs": [
+        {"time": "2024-05-01 10:00:01", "user": "admin", "event": "login", "password": "hunter2"},
+        {"time": "2024-05-01 10:02:13", "user": "guest", "event": "view", "email": "guest@lab.local"},
+    ]}),
+    "/admin": "",
+    "/backup": "",
+}
+LOCKED = ("/admin",)
+
+
+class _BackendHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path not in BACKEND_FILES:
+            self.send_error(404)
+            return
+        body = BACKEND_FILES[self.path].encode()
+        self.send_response(403 if self.path in LOCKED else 200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@contextlib.contextmanager
+def local_backend():
+    """Serves BACKEND_FILES on a free localhost port for the duration of the block, yields the base URL."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _BackendHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}/"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+# --- STEPS ---
+def load_only(driver):
+    pass
+
+
+def replay(driver):
+    driver.set_text("MQTT Topic", "home/livingroom/led/set")
+    driver.set_text("Message Payload", "ON")
+    driver.click("📡 Replay Signal")
+    driver.expect("success", "Completed")
+
+
+def dos(driver):
+    driver.click("🚀 Launch Stress Test")
+    driver.expect("success", "Completed")
+
+
+def ping(driver):
+    driver.click("Run Ping")
+    driver.expect("success", "Completed")
+
+
+def nmap_background(driver):
+    driver.set_text("Target IP / Subnet", "192.168.1.0/24")
+    driver.click("🚀 Launch Scan")
+    driver.wait_background("nmap_scan")
+    driver.expect("success", "Completed")
+    driver.expect("markdown", "Hosts (3 completed)")
+    # The result must survive the spilled log being evicted
+    os.remove(driver.at.session_state["background_runs"]["nmap_scan"].log_path)
+    driver.run("rerun")
+    driver.expect("success", "Completed")
+
+
+def wifi_scan(driver):
+    driver.at.slider[0].set_value(5)
+    driver.click("📡 Scan Networks")
+    if not driver.at.dataframe:
+        raise CaseFailed("No scan table")
+
+
+def mitm_sniff(driver):
+    driver.click("☠️ Start ARP Poisoning")
+    driver.click("👀 Start Sniffing Filtered Traffic")
+    driver.wait_for("code", "[DECODED]")
+    driver.click("🛑 Stop Attack")
+
+
+def pcap_analysis(driver):
+    capture = os.path.join(os.environ.get("VISUALHACK_DATA", tempfile.gettempdir()), "bench-capture.pcap")
+    with open(capture, "wb") as f:
+        f.write(os.urandom(64 * 1024))
+    driver.set_text("Pcap / pcapng file", capture)
+    driver.click("🔍 Analyze Capture")
+    driver.expect("error", "SYNs they did not answer")
+
+
+def exfiltrate(driver):
+    with local_backend() as base:
+        driver.set_text("Sensitive Asset URL", base + "system_logs.json")
+        driver.click("🚀 Exfiltrate Data")
+    driver.expect("success", "Data Exfiltrated")
+    driver.expect("error", "SENSITIVE KEYWORDS FOUND")
+
+
+def firmware(driver):
+    firmware_dir = os.path.join(os.environ.get("VISUALHACK_DATA", tempfile.gettempdir()), "firmware")
+    os.makedirs(firmware_dir, exist_ok=True)
+    with open(os.path.join(firmware_dir, "firmware.bin"), "wb") as f:
+        f.write(os.urandom(4096))
+    driver.set_text("Firmware Directory Path", firmware_dir)
+    driver.set_number("Hosting Port", free_port())
+    driver.click("🚀 Start Hosting")
+    driver.expect("success", "Active")
+    driver.click("💀 Execute Firmware Update")
+    driver.expect("success", "Completed")
+    driver.click("🛑 Stop Server")
+    driver.expect("error", "Inactive")
+
+
+def fuzz(driver):
+    with local_backend() as base:
+        driver.set_text("Target Base URL", base)
+        driver.click("🚀 Start Enumeration")
+    driver.expect("success", "FOUND: /system_logs.json")
+    driver.expect("warning", "LOCKED: /admin")
+    driver.expect("success", "Scan Complete")
+
+
+def build_report(driver):
+    driver.click("📝 Build Report")
+    if not driver.at.metric:
+        raise CaseFailed("No report summary")
+
+
+# name: (page, steps, extra environment)
+CASES = {
+    "dashboard": ("app.py", load_only, {}),
+    "jobs_page": ("pages/6_Jobs.py", load_only, {}),
+    "history_page": ("pages/7_History.py", load_only, {}),
+    "metrics_page": ("pages/12_Metrics.py", load_only, {}),
+    "report_page": ("pages/13_Report.py", build_report, {}),
+    "reply": ("pages/3_Reply.py", replay, {}),
+    "dos": ("pages/4_DOS.py", dos, {}),
+    "ping": ("pages/9_Availability.py", ping, {}),
+    "ping_fast": ("pages/9_Availability.py", ping, {"BENCH_LINE_RATE": "0"}),
+    "ping_huge_stderr": ("pages/9_Availability.py", ping, {"BENCH_SCENARIO": "huge_stderr"}),
+    "ping_no_newline": ("pages/9_Availability.py", ping, {"BENCH_SCENARIO": "no_newline", "BENCH_LINE_RATE": "0"}),
+    "ping_long_run": ("pages/9_Availability.py", ping, {"BENCH_SCENARIO": "long_run", "BENCH_LONG_SECONDS": "10", "BENCH_LINE_RATE": "500"}),
+    "nmap_background": ("pages/8_Network_Recon.py", nmap_background, {"BENCH_LINE_RATE": "4"}),
+    "wifi_scan": ("pages/0_WIFI_Attack.py", wifi_scan, {}),
+    "mitm_sniff": ("pages/1_Mitm.py", mitm_sniff, {"BENCH_LINE_RATE": "10"}),
+    "pcap_analysis": ("pages/11_Pcap_Analysis.py", pcap_analysis, {"BENCH_LINE_RATE": "0"}),
+    "exfiltration": ("pages/2_Privacy_Data_Exfiltration.py", exfiltrate, {}),
+    "firmware_ota": ("pages/5_InsecureFirmware.py", firmware, {}),
+    "file_fuzzer": ("pages/10_File_Fuzzer.py", fuzz, {}),
+}
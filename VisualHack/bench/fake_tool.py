@@ -0,0 +1,116 @@
+"""
+Stand-in for the external tools, installed on PATH by bench/run.py.
+
+Usage: fake_tool.py <tool> [tool arguments...]
+
+Replays bench/recordings/<tool>.txt on stdout and writes the files the
+real tool would (nmap -oX/-oN, airodump-ng -w). Behaviour is set through
+the environment:
+
+    BENCH_SCENARIO      normal | huge_stderr | no_newline | long_run
+    BENCH_LINE_RATE     lines per second, 0 for as fast as possible (default 200)
+    BENCH_LONG_SECONDS  how long a long_run keeps replaying (default 20)
+    BENCH_STDERR_MB     volume written by huge_stderr (default 20)
+"""
+import os
+import signal
+import sys
+import time
+
+RECORDINGS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "recordings")
+
+# Tools that stay up until they are terminated, like the real listeners
+DAEMONS = ("ettercap", "airodump-ng")
+
+
+def recording(name):
+    path = os.path.join(RECORDINGS, name)
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as f:
+        return f.read().splitlines()
+
+
+def option(args, flag):
+    return args[args.index(flag) + 1] if flag in args[:-1] else None
+
+
+def paced(lines, rate):
+    interval = 1.0 / rate if rate > 0 else 0
+    start = time.monotonic()
+    for index, line in enumerate(lines):
+        if interval:
+            delay = start + index * interval - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        yield line
+
+
+def write_side_files(tool, args, rate):
+    """Writes the output files the real tool would leave behind."""
+    if tool == "nmap":
+        normal = option(args, "-oN")
+        if normal:
+            with open(normal, "w") as f:
+                f.write("\n".join(recording("nmap.txt")) + "\n")
+        xml = option(args, "-oX")
+        if xml:
+            # Host by host, so the page's incremental parser sees a growing file
+            with open(xml, "w") as f:
+                for line in paced(recording("nmap.xml"), rate):
+                    f.write(line + "\n")
+                    f.flush()
+    elif tool == "airodump-ng":
+        prefix = option(args, "-w")
+        if prefix:
+            with open(f"{prefix}-01.csv", "w", newline="") as f:
+                f.write("\r\n".join(recording("airodump-ng.csv")) + "\r\n")
+
+
+def main():
+    tool = sys.argv[1]
+    args = sys.argv[2:]
+    scenario = os.environ.get("BENCH_SCENARIO", "normal")
+    rate = float(os.environ.get("BENCH_LINE_RATE", 200))
+
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+
+    name = "tshark-r.txt" if tool == "tshark" and "-r" in args else f"{tool}.txt"
+    lines = recording(name)
+    out = sys.stdout
+
+    write_side_files(tool, args, rate)
+
+    if scenario == "huge_stderr":
+        chunk = "warning: " + "x" * 1014 + "\n"
+        for _ in range(int(float(os.environ.get("BENCH_STDERR_MB", 20)) * 1024)):
+            sys.stderr.write(chunk)
+        sys.stderr.flush()
+    elif scenario == "no_newline":
+        # One endless line, flushed in pieces
+        for line in paced(lines * 50, rate):
+            out.write(line + " ")
+            out.flush()
+        return 0
+    elif scenario == "long_run":
+        deadline = time.monotonic() + float(os.environ.get("BENCH_LONG_SECONDS", 20))
+        while time.monotonic() < deadline:
+            for line in paced(lines or ["tick"], rate):
+                out.write(line + "\n")
+                out.flush()
+                if time.monotonic() >= deadline:
+                    break
+        return 0
+
+    for line in paced(lines, rate):
+        out.write(line + "\n")
+        out.flush()
+
+    if tool in DAEMONS:
+        while True:
+            time.sleep(1)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
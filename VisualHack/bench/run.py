@@ -0,0 +1,188 @@
+"""
+Headless benchmark and regression check for the dashboard pages.
+
+Every case opens one page through Streamlit's AppTest in a fresh process,
+with stand-in executables (bench/fake_tool.py) first on PATH and a
+throw-away data directory, so it needs no root, radios, tools or network.
+
+Usage (from the VisualHack directory):
+    python bench/run.py                      # all cases, compared to bench/baseline.json
+    python bench/run.py ping dos             # selected cases
+    python bench/run.py --update-baseline    # store the current numbers as the baseline
+
+Exits with 1 when a case fails or a number regressed beyond its tolerance.
+"""
+import argparse
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.dirname(BENCH_DIR)
+BASELINE_PATH = os.path.join(BENCH_DIR, "baseline.json")
+
+SHIMMED_TOOLS = (
+    "nmap", "hping3", "tshark", "aircrack-ng", "airodump-ng", "aireplay-ng",
+    "airmon-ng", "mosquitto_pub", "ping", "ettercap", "iwconfig",
+)
+
+# metric: (relative tolerance, absolute slack) before a higher value counts as a regression
+CHECKS = {
+    "load_ms": (0.5, 150),
+    "rerun_p50_ms": (0.5, 25),
+    "action_ms": (0.5, 300),
+    "renders": (0.5, 5),
+    "peak_rss_mb": (0.25, 25),
+    "wall_s": (0.5, 1.0),
+}
+
+CASE_TIMEOUT = 180
+
+
+def install_shims(directory):
+    for tool in SHIMMED_TOOLS:
+        path = os.path.join(directory, tool)
+        with open(path, "w") as f:
+            f.write(f'#!/bin/sh\nexec "{sys.executable}" "{os.path.join(BENCH_DIR, "fake_tool.py")}" {tool} "$@"\n')
+        os.chmod(path, 0o755)
+
+
+# --- CHILD: ONE CASE ---
+def run_case(name):
+    sys.path.insert(0, APP_DIR)
+    sys.path.insert(0, BENCH_DIR)
+    os.chdir(APP_DIR)
+    from cases import CASES, IDLE_RERUNS, CaseFailed, Driver
+
+    page, steps, _ = CASES[name]
+    started = time.perf_counter()
+    driver = Driver(page, timeout=CASE_TIMEOUT)
+    error = None
+    try:
+        driver.run("load")
+        for _ in range(IDLE_RERUNS):
+            driver.run("rerun")
+        steps(driver)
+    except CaseFailed as e:
+        error = str(e)
+    wall = time.perf_counter() - started
+
+    events = []
+    events_path = os.path.join(os.environ["VISUALHACK_DATA"], "metrics", "events.jsonl")
+    if os.path.exists(events_path):
+        with open(events_path) as f:
+            events = [json.loads(line) for line in f]
+
+    reruns = [t for label, t in driver.timings if label == "rerun"]
+    return {
+        "case": name,
+        "error": error,
+        "load_ms": round(next((t for label, t in driver.timings if label == "load"), 0) * 1000, 1),
+        "rerun_p50_ms": round(statistics.median(reruns) * 1000, 1) if reruns else None,
+        "rerun_max_ms": round(max(reruns) * 1000, 1) if reruns else None,
+        "action_ms": round(sum(t for label, t in driver.timings if label == "action") * 1000, 1),
+        "script_runs": len(driver.timings),
+        "tool_runs": len(events),
+        "renders": sum(e["renders"] for e in events),
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "tool_peak_rss_mb": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024, 1),
+        "wall_s": round(wall, 2),
+    }
+
+
+# --- PARENT ---
+def spawn_case(name, shim_dir, extra_env):
+    with tempfile.TemporaryDirectory(prefix=f"bench-{name}-") as data_dir:
+        env = dict(os.environ, **extra_env)
+        env["PATH"] = shim_dir + os.pathsep + env.get("PATH", "")
+        env["VISUALHACK_DATA"] = data_dir
+        env.pop("VISUALHACK_METRICS_DIR", None)
+        proc = subprocess.run(
+            [sys.executable, __file__, "--child", name],
+            env=env, capture_output=True, text=True, timeout=CASE_TIMEOUT * 2,
+        )
+    for line in reversed(proc.stdout.splitlines()):
+        if line.startswith("{"):
+            return json.loads(line)
+    return {"case": name, "error": (proc.stderr.strip().splitlines() or ["no result"])[-1]}
+
+
+def regressions(result, baseline, scale):
+    found = []
+    for metric, (relative, slack) in CHECKS.items():
+        old, new = baseline.get(metric), result.get(metric)
+        if old is None or new is None:
+            continue
+        limit = old * (1 + relative * scale) + slack
+        if new > limit:
+            found.append(f"{metric} {new} > {limit:.1f} (baseline {old})")
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("cases", nargs="*", help="Cases to run, default all")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=1.0, help="Scales every relative tolerance")
+    parser.add_argument("--json", help="Also write the results to this file")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_case(args.child)))
+        return 0
+
+    sys.path.insert(0, BENCH_DIR)
+    from cases import CASES
+
+    names = args.cases or list(CASES)
+    unknown = [n for n in names if n not in CASES]
+    if unknown:
+        parser.error(f"unknown case(s): {', '.join(unknown)}")
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    results, failed = [], False
+    with tempfile.TemporaryDirectory(prefix="bench-shims-") as shim_dir:
+        install_shims(shim_dir)
+        for name in names:
+            result = spawn_case(name, shim_dir, CASES[name][2])
+            results.append(result)
+            problems = [result["error"]] if result.get("error") else []
+            if not args.update_baseline and name in baseline:
+                problems += regressions(result, baseline[name], args.tolerance)
+            failed |= bool(problems)
+            status = "FAIL" if problems else "ok"
+            print(f"{status:4} {name:18} load {result.get('load_ms')} ms · rerun p50 {result.get('rerun_p50_ms')} ms · "
+                  f"action {result.get('action_ms')} ms · renders {result.get('renders')} · "
+                  f"rss {result.get('peak_rss_mb')} MB · wall {result.get('wall_s')} s")
+            for problem in problems:
+                print(f"       {problem}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=1)
+
+    if args.update_baseline:
+        for result in results:
+            if not result.get("error"):
+                baseline[result["case"]] = {k: result[k] for k in CHECKS if result.get(k) is not None}
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=1, sort_keys=True)
+            f.write("\n")
+        print(f"Baseline written to {args.baseline}")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
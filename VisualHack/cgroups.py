@@ -0,0 +1,282 @@
+import itertools
+import os
+import shutil
+import threading
+import time
+
+CGROUP_ROOT = "/sys/fs/cgroup"
+CONTROLLERS = ("cpu", "memory", "io")
+
+# CPU share of all tools together against the dashboard (cgroup default is 100)
+JOBS_CPU_WEIGHT = int(os.environ.get("VISUALHACK_JOBS_CPU_WEIGHT", 50))
+
+# Defaults for each job: share of all CPUs in percent, memory ceiling in MB (0 = no limit)
+DEFAULT_LIMITS = {
+    "weight": 100,
+    "cpu": int(os.environ.get("VISUALHACK_JOB_CPU_PERCENT", 80)),
+    "memory": int(os.environ.get("VISUALHACK_JOB_MEMORY_MB", 0)),
+}
+
+# Per-tool overrides of DEFAULT_LIMITS.
+# Override with e.g. VISUALHACK_CGROUP_LIMITS="aircrack-ng.cpu=50,nmap.memory=512"
+TOOL_LIMITS = {
+    "aircrack-ng": {"cpu": 75, "weight": 50},
+    "hping3": {"cpu": 50},
+    "nmap": {"memory": 1024},
+}
+
+CPU_PERIOD = 100_000
+
+# How long collect() waits for leftover processes to leave a job cgroup
+REMOVE_TIMEOUT = 2.0
+
+
+def _tool_limits_from_env():
+    limits = {tool: dict(values) for tool, values in TOOL_LIMITS.items()}
+    for item in os.environ.get("VISUALHACK_CGROUP_LIMITS", "").split(","):
+        key, _, value = item.partition("=")
+        tool, _, setting = key.strip().rpartition(".")
+        if tool and setting in DEFAULT_LIMITS and value.strip().isdigit():
+            limits.setdefault(tool, {})[setting] = int(value)
+    return limits
+
+
+def _read(path):
+    with open(path) as f:
+        return f.read()
+
+
+def _write(path, value):
+    with open(path, "w") as f:
+        f.write(value)
+
+
+class Cgroup:
+    """One job's cgroup. Wrap the command with argv(), call collect() once it has exited."""
+
+    def __init__(self, path):
+        self.path = path
+        self.usage = None
+        self.joined = None
+
+    def argv(self, command_list):
+        """
+        Prefixes the command with a shell that moves itself into the cgroup and then execs the tool,
+        so the tool keeps the pid Popen returned. If the move fails the tool runs unconfined.
+        A tool that isn't on PATH is returned unwrapped, so Popen still raises FileNotFoundError.
+        """
+        if not command_list or shutil.which(command_list[0]) is None:
+            return list(command_list)
+        script = 'echo $$ > "$0/cgroup.procs" 2>/dev/null; exec "$@"'
+        return ["/bin/sh", "-c", script, self.path, *command_list]
+
+    def collect(self):
+        """
+        Reads CPU, peak memory and I/O totals, kills stragglers and removes the cgroup. Returns the usage dict,
+        every value is None when the tool never made it into the cgroup.
+        """
+        if self.usage is not None:
+            return self.usage
+        usage = {"cpu_s": None, "user_s": None, "system_s": None, "memory_peak": None, "io_read": None, "io_write": None, "oom_kills": 0}
+        try:
+            stat = dict(line.split() for line in _read(os.path.join(self.path, "cpu.stat")).splitlines())
+            if int(stat["usage_usec"]) == 0:
+                # The shell exec'ing the tool inside the cgroup always costs some CPU, so nothing
+                # ever joined it: the move in argv() failed and the numbers below say nothing
+                self.joined = False
+            else:
+                self.joined = True
+                usage["cpu_s"] = int(stat["usage_usec"]) / 1e6
+                usage["user_s"] = int(stat["user_usec"]) / 1e6
+                usage["system_s"] = int(stat["system_usec"]) / 1e6
+        except (OSError, KeyError, ValueError):
+            pass
+        if self.joined is False:
+            usage["oom_kills"] = None
+            self.usage = usage
+            self._remove()
+            return usage
+        try:
+            usage["memory_peak"] = int(_read(os.path.join(self.path, "memory.peak")))
+        except (OSError, ValueError):
+            pass  # memory.peak needs Linux 5.19
+        try:
+            read = write = 0
+            for line in _read(os.path.join(self.path, "io.stat")).splitlines():
+                fields = dict(f.split("=", 1) for f in line.split()[1:] if "=" in f)
+                read += int(fields.get("rbytes", 0))
+                write += int(fields.get("wbytes", 0))
+            usage["io_read"], usage["io_write"] = read, write
+        except (OSError, ValueError):
+            pass
+        try:
+            events = dict(line.split() for line in _read(os.path.join(self.path, "memory.events")).splitlines())
+            usage["oom_kills"] = int(events.get("oom_kill", 0))
+        except (OSError, ValueError):
+            pass
+        self.usage = usage
+        self._remove()
+        return usage
+
+    def _remove(self):
+        # Children that left the process group would keep the cgroup busy
+        try:
+            _write(os.path.join(self.path, "cgroup.kill"), "1")
+        except OSError:
+            pass
+        deadline = time.monotonic() + REMOVE_TIMEOUT
+        while True:
+            try:
+                os.rmdir(self.path)
+                return
+            except FileNotFoundError:
+                return
+            except OSError:
+                if time.monotonic() > deadline:
+                    return
+                time.sleep(0.05)
+
+
+class CgroupManager:
+    """
+    Puts every spawned tool into its own cgroup v2 child with CPU and memory limits.
+
+    On start the dashboard moves itself into a "dashboard" child of its own
+    cgroup and creates a sibling "jobs" group with a lower CPU weight, so no
+    amount of tool load can starve the Streamlit server. Each job then gets
+    a cgroup below "jobs", whose cpu.stat, memory.peak and io.stat are read
+    back after it exits.
+
+    Without a writable cgroup v2 hierarchy (cgroup v1, no delegation, not
+    root, a cgroup shared with other processes) `available` is False,
+    create() returns None and tools run as before. A setup that fails half
+    way moves the server back to the cgroup it was started in.
+
+    Args:
+        root (str): Mount point of the unified hierarchy.
+    """
+
+    def __init__(self, root=CGROUP_ROOT):
+        self.root = root
+        self.jobs_dir = None
+        self.reason = None
+        self.tool_limits = _tool_limits_from_env()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        try:
+            self._setup()
+        except OSError as e:
+            self.reason = f"{e.strerror or e}: {e.filename or ''}".strip(": ")
+            self.jobs_dir = None
+
+    @property
+    def available(self):
+        return self.jobs_dir is not None
+
+    def _setup(self):
+        if not os.path.exists(os.path.join(self.root, "cgroup.controllers")):
+            self.reason = "cgroup v2 is not mounted"
+            return
+        own = next(
+            (line[3:].strip() for line in _read("/proc/self/cgroup").splitlines() if line.startswith("0::")), None
+        )
+        if own is None:
+            self.reason = "not in a cgroup v2 hierarchy"
+            return
+
+        current = os.path.join(self.root, own.lstrip("/"))
+        parent = current
+        if os.path.basename(parent) == "dashboard":
+            parent = os.path.dirname(parent)  # Already moved by an earlier start
+        available = _read(os.path.join(parent, "cgroup.controllers")).split()
+        wanted = [c for c in CONTROLLERS if c in available]
+
+        # A cgroup with processes can't hand controllers to its children, so the server moves down one
+        # level. That only helps when the cgroup is delegated to us and nothing else runs in it, which
+        # is not the case under e.g. `sudo streamlit run` from a login shell.
+        if parent != self.root:
+            if not all(os.access(os.path.join(parent, name), os.W_OK) for name in ("cgroup.procs", "cgroup.subtree_control")):
+                self.reason = f"{own} is not delegated to this user, start with `systemd-run --user --scope -p Delegate=yes`"
+                return
+            others = set(_read(os.path.join(parent, "cgroup.procs")).split()) - {str(os.getpid())}
+            if others:
+                self.reason = f"{own} is shared with {len(others)} other process(es), start with `systemd-run --scope -p Delegate=yes`"
+                return
+
+        dashboard = os.path.join(parent, "dashboard")
+        jobs = os.path.join(parent, "jobs")
+        created = [d for d in (dashboard, jobs) if not os.path.isdir(d)]
+        try:
+            if parent != self.root:
+                os.makedirs(dashboard, exist_ok=True)
+                _write(os.path.join(dashboard, "cgroup.procs"), str(os.getpid()))
+            _write(os.path.join(parent, "cgroup.subtree_control"), " ".join(f"+{c}" for c in wanted))
+
+            os.makedirs(jobs, exist_ok=True)
+            _write(os.path.join(jobs, "cgroup.subtree_control"), " ".join(f"+{c}" for c in wanted))
+            if "cpu" in wanted:
+                _write(os.path.join(jobs, "cpu.weight"), str(JOBS_CPU_WEIGHT))
+        except OSError:
+            self._rollback(current, parent, created, wanted)
+            raise
+        self.jobs_dir = jobs
+
+    def _rollback(self, current, parent, created, wanted):
+        # Undo a partial setup so the server ends up where it was started, every step is best effort
+        steps = []
+        if os.path.join(parent, "jobs") in created:
+            steps.append((os.path.join(parent, "jobs", "cgroup.subtree_control"), " ".join(f"-{c}" for c in wanted)))
+        if current == parent:
+            steps.append((os.path.join(parent, "cgroup.subtree_control"), " ".join(f"-{c}" for c in wanted)))
+        steps.append((os.path.join(current, "cgroup.procs"), str(os.getpid())))
+        for path, value in steps:
+            try:
+                _write(path, value)
+            except OSError:
+                pass
+        for directory in created:
+            try:
+                os.rmdir(directory)
+            except OSError:
+                pass
+
+    def limits(self, tool):
+        return dict(DEFAULT_LIMITS, **self.tool_limits.get(tool, {}))
+
+    def create(self, tool):
+        """Creates a cgroup for one run of `tool` with its configured limits, or returns None."""
+        if not self.available:
+            return None
+        limits = self.limits(tool)
+        with self._lock:
+            name = f"{tool}-{os.getpid()}-{next(self._ids)}"
+        path = os.path.join(self.jobs_dir, name)
+        try:
+            os.mkdir(path)
+            _write(os.path.join(path, "cpu.weight"), str(limits["weight"]))
+            if limits["cpu"]:
+                quota = int(CPU_PERIOD * (os.cpu_count() or 1) * limits["cpu"] / 100)
+                _write(os.path.join(path, "cpu.max"), f"{quota} {CPU_PERIOD}")
+            if limits["memory"]:
+                _write(os.path.join(path, "memory.max"), str(limits["memory"] * 2**20))
+        except OSError:
+            try:
+                os.rmdir(path)
+            except OSError:
+                pass
+            return None
+        return Cgroup(path)
+
+
+def format_usage(usage):
+    """One-line summary of a usage dict for tables, '' when nothing was measured."""
+    if not usage or usage.get("cpu_s") is None:
+        return ""
+    parts = [f"CPU {usage['cpu_s']:.2f}s"]
+    if usage.get("memory_peak") is not None:
+        parts.append(f"peak {usage['memory_peak'] / 2**20:.1f} MB")
+    if usage.get("io_read") is not None:
+        parts.append(f"I/O {usage['io_read'] / 2**20:.1f}/{usage['io_write'] / 2**20:.1f} MB")
+    if usage.get("oom_kills"):
+        parts.append(f"{usage['oom_kills']} OOM kill(s)")
+    return " · ".join(parts)
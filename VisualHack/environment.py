@@ -0,0 +1,133 @@
+import os
+import shutil
+import socket
+import statistics
+import threading
+import time
+from collections import deque
+
+# Probes older than this are redone on the next lookup
+ENV_TTL = float(os.environ.get("VISUALHACK_ENV_TTL", 30))
+
+# Startup samples kept per page for the timing readout
+TIMING_SAMPLES = 50
+
+# Tools the modules need, listed in the status panel
+KNOWN_TOOLS = (
+    "airmon-ng", "airodump-ng", "aireplay-ng", "aircrack-ng", "iwconfig",
+    "ettercap", "tshark", "nmap", "mosquitto_pub", "ping",
+)
+
+
+class Environment:
+    """
+    Process-wide cache of what this machine can do.
+
+    Tool lookups, root status, network interfaces and the local IP are
+    probed on first use and reused by every page and session until they are
+    older than `ttl` seconds, so a rerun doesn't walk PATH or open sockets.
+    It also keeps the startup times pages report through record_startup().
+
+    Args:
+        ttl (float): Seconds a probe result stays valid.
+    """
+
+    def __init__(self, ttl=ENV_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._cache = {}
+        self._timings = {}
+
+    def _get(self, key, probe):
+        now = time.monotonic()
+        with self._lock:
+            hit = self._cache.get(key)
+            if hit is not None and now - hit[0] < self.ttl:
+                return hit[1]
+        value = probe()
+        with self._lock:
+            self._cache[key] = (now, value)
+        return value
+
+    def refresh(self):
+        """Drops every cached probe, e.g. after installing a tool."""
+        with self._lock:
+            self._cache.clear()
+
+    # --- PROBES ---
+    def which(self, tool):
+        return self._get(("which", tool), lambda: shutil.which(tool))
+
+    def has(self, *tools):
+        """True when every tool is on PATH."""
+        return all(self.which(tool) for tool in tools)
+
+    def missing(self, *tools):
+        return [tool for tool in tools if not self.which(tool)]
+
+    def is_root(self):
+        return self._get("root", lambda: os.geteuid() == 0)
+
+    def interfaces(self):
+        """Network interfaces as {name: {"wireless": bool, "up": bool}}."""
+        return self._get("interfaces", _probe_interfaces)
+
+    def local_ip(self):
+        return self._get("local_ip", _probe_local_ip)
+
+    def snapshot(self):
+        return {
+            "root": self.is_root(),
+            "local_ip": self.local_ip(),
+            "interfaces": self.interfaces(),
+            "tools": {tool: self.which(tool) for tool in KNOWN_TOOLS},
+        }
+
+    # --- STARTUP TIMING ---
+    def record_startup(self, page, seconds):
+        with self._lock:
+            self._timings.setdefault(page, deque(maxlen=TIMING_SAMPLES)).append(seconds)
+
+    def startup_stats(self):
+        """Per page: last, median and worst startup time in ms over the kept samples."""
+        with self._lock:
+            timings = {page: list(samples) for page, samples in self._timings.items()}
+        return [
+            {
+                "Page": page,
+                "Last (ms)": round(samples[-1] * 1000, 1),
+                "Median (ms)": round(statistics.median(samples) * 1000, 1),
+                "Max (ms)": round(max(samples) * 1000, 1),
+                "Reruns": len(samples),
+            }
+            for page, samples in sorted(timings.items())
+        ]
+
+
+def _probe_interfaces():
+    interfaces = {}
+    try:
+        names = sorted(os.listdir("/sys/class/net"))
+    except OSError:
+        return {name: {"wireless": False, "up": True} for _, name in socket.if_nameindex()}
+    for name in names:
+        base = os.path.join("/sys/class/net", name)
+        try:
+            with open(os.path.join(base, "operstate")) as f:
+                up = f.read().strip() != "down"
+        except OSError:
+            up = False
+        interfaces[name] = {"wireless": os.path.isdir(os.path.join(base, "wireless")), "up": up}
+    return interfaces
+
+
+def _probe_local_ip():
+    s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        # This doesn't actually connect but gets the interface IP
+        s.connect(('10.255.255.255', 1))
+        return s.getsockname()[0]
+    except OSError:
+        return "127.0.0.1"
+    finally:
+        s.close()
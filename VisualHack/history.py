@@ -0,0 +1,222 @@
+import contextlib
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+from artifacts import DATA_DIR, open_compressed
+
+DB_PATH = os.path.join(DATA_DIR, "history.db")
+
+# Only this much of a log (half from the start, half from the end) goes into
+# the full-text index, so a multi-GB ping log doesn't bloat the database
+FTS_MAX_BYTES = 4 * 2**20
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id          INTEGER PRIMARY KEY,
+    session_id  TEXT,
+    kind        TEXT NOT NULL,
+    tool        TEXT NOT NULL,
+    argv        TEXT NOT NULL,
+    started_at  REAL NOT NULL,
+    ended_at    REAL,
+    exit_code   INTEGER,
+    status      TEXT NOT NULL,
+    log_path    TEXT,
+    log_bytes   INTEGER,
+    cpu_s       REAL,
+    memory_peak INTEGER,
+    io_read     INTEGER,
+    io_write    INTEGER
+);
+CREATE INDEX IF NOT EXISTS runs_started ON runs (started_at, id);
+CREATE INDEX IF NOT EXISTS runs_tool ON runs (tool, started_at);
+CREATE INDEX IF NOT EXISTS runs_status ON runs (status, started_at);
+CREATE VIRTUAL TABLE IF NOT EXISTS runs_fts USING fts5 (body, content='');
+"""
+
+# Resource usage read back from a run's cgroup, added to databases created before it was recorded
+USAGE_COLUMNS = {"cpu_s": "REAL", "memory_peak": "INTEGER", "io_read": "INTEGER", "io_write": "INTEGER"}
+
+
+class RunStore:
+    """
+    SQLite record of every tool run, with a full-text index over its output.
+
+    All writes go through one background thread, so callers never block on
+    compressing or indexing a large log. Reads open their own connection.
+    Finished logs are archived compressed in the artifact store, so they
+    count towards its disk quota.
+
+    Args:
+        artifacts (ArtifactStore): Receives the archived logs.
+        db_path (str): Location of the SQLite database.
+    """
+
+    def __init__(self, artifacts, db_path=DB_PATH):
+        self.artifacts = artifacts
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+
+        with contextlib.closing(self._connect()) as conn, conn:
+            conn.executescript(SCHEMA)
+            existing = {row["name"] for row in conn.execute("PRAGMA table_info(runs)")}
+            for column, kind in USAGE_COLUMNS.items():
+                if column not in existing:
+                    conn.execute(f"ALTER TABLE runs ADD COLUMN {column} {kind}")
+            # Runs that were alive when the server died will never finish
+            conn.execute("UPDATE runs SET status = 'lost' WHERE status = 'running'")
+
+        self._writes = queue.Queue()
+        threading.Thread(target=self._writer, daemon=True).start()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    # --- RECORDING ---
+    def start_run(self, argv, session_id=None, kind="command"):
+        """Records a run that has just started and returns its id."""
+        with contextlib.closing(self._connect()) as conn, conn:
+            cur = conn.execute(
+                "INSERT INTO runs (session_id, kind, tool, argv, started_at, status) VALUES (?, ?, ?, ?, ?, 'running')",
+                (session_id, kind, os.path.basename(argv[0]), json.dumps(list(argv)), time.time()),
+            )
+            return cur.lastrowid
+
+    def finish_run(self, run_id, exit_code, status, log_path=None, usage=None):
+        """
+        Queues the end of a run. Its log is compressed into the archive and indexed off-thread.
+        `usage` is the dict Cgroup.collect() returned, if the run was confined.
+        """
+        self._writes.put((run_id, exit_code, status, log_path, usage or {}, time.time()))
+
+    def _writer(self):
+        conn = self._connect()
+        while True:
+            run_id, exit_code, status, log_path, usage, ended_at = self._writes.get()
+            archived, size = None, None
+            try:
+                if log_path and os.path.exists(log_path):
+                    size = os.path.getsize(log_path)
+                    tool = conn.execute("SELECT tool FROM runs WHERE id = ?", (run_id,)).fetchone()["tool"]
+                    run_dir = self.artifacts.new_run(f"log_{tool}_{run_id}")
+                    archived = self.artifacts.import_file(run_dir, "output.log", log_path)
+                    conn.execute("INSERT INTO runs_fts (rowid, body) VALUES (?, ?)", (run_id, _index_text(log_path, size)))
+                self._finish(conn, run_id, exit_code, status, archived, size, usage, ended_at)
+                if archived:
+                    self.artifacts.spill_archived(log_path)
+            except Exception:
+                conn.rollback()
+                # Archiving or indexing the log failed, the run still gets its end, just without a log
+                try:
+                    self._finish(conn, run_id, exit_code, status, None, None, usage, ended_at)
+                except Exception:
+                    conn.rollback()
+
+    @staticmethod
+    def _finish(conn, run_id, exit_code, status, log_path, size, usage, ended_at):
+        conn.execute(
+            "UPDATE runs SET ended_at = ?, exit_code = ?, status = ?, log_path = ?, log_bytes = ?, "
+            "cpu_s = ?, memory_peak = ?, io_read = ?, io_write = ? WHERE id = ?",
+            (ended_at, exit_code, status, log_path, size, *(usage.get(c) for c in USAGE_COLUMNS), run_id),
+        )
+        conn.commit()
+
+    # --- QUERIES ---
+    def search(self, text=None, tool=None, status=None, since=None, until=None, before=None, session_id=None, limit=50):
+        """
+        Returns up to `limit` runs, newest first.
+        Args:
+            text (str): Full-text query over the logs (FTS5 syntax, falls back to a plain phrase).
+            tool (str): Only runs of this tool.
+            status (str): Only runs with this status.
+            since (float): Only runs started at or after this timestamp.
+            until (float): Only runs started before this timestamp.
+            before (tuple): (started_at, id) of the last row of the previous page.
+            session_id (str): Only runs started from this browser session.
+        """
+        clauses, params = [], []
+        if tool:
+            clauses.append("tool = ?")
+            params.append(tool)
+        if status:
+            clauses.append("status = ?")
+            params.append(status)
+        if since is not None:
+            clauses.append("started_at >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("started_at < ?")
+            params.append(until)
+        if before is not None:
+            clauses.append("(started_at, id) < (?, ?)")
+            params.extend(before)
+        if session_id is not None:
+            clauses.append("session_id = ?")
+            params.append(session_id)
+        if text:
+            clauses.append("id IN (SELECT rowid FROM runs_fts WHERE runs_fts MATCH ?)")
+            params.append(text)
+
+        sql = "SELECT * FROM runs"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY started_at DESC, id DESC LIMIT ?"
+        params.append(limit)
+
+        with contextlib.closing(self._connect()) as conn:
+            try:
+                rows = conn.execute(sql, params).fetchall()
+            except sqlite3.OperationalError:
+                if not text:
+                    raise
+                # Not valid FTS syntax, search for it as a literal phrase
+                params[params.index(text)] = '"' + text.replace('"', '""') + '"'
+                rows = conn.execute(sql, params).fetchall()
+        return [dict(r) for r in rows]
+
+    def get(self, run_id):
+        with contextlib.closing(self._connect()) as conn:
+            row = conn.execute("SELECT * FROM runs WHERE id = ?", (run_id,)).fetchone()
+        return dict(row) if row else None
+
+    def tools(self):
+        with contextlib.closing(self._connect()) as conn:
+            return [r[0] for r in conn.execute("SELECT DISTINCT tool FROM runs ORDER BY tool")]
+
+
+def run_status(returncode, stopped=False):
+    """The status a finished run is recorded with: "ok", "stopped" (terminated on purpose) or "failed"."""
+    if returncode == 0:
+        return "ok"
+    return "stopped" if stopped else "failed"
+
+
+def _index_text(log_path, size):
+    with open(log_path, "rb") as f:
+        if size <= FTS_MAX_BYTES:
+            data = f.read()
+        else:
+            data = f.read(FTS_MAX_BYTES // 2)
+            f.seek(size - FTS_MAX_BYTES // 2)
+            data += b"\n" + f.read()
+    return data.decode("utf-8", errors="replace")
+
+
+def read_archived_log(path, start=0, count=500):
+    """Reads `count` lines from a compressed log, starting at line `start`."""
+    lines = []
+    with open_compressed(path, "rt") as f:
+        for number, line in enumerate(f):
+            if number < start:
+                continue
+            lines.append(line.rstrip("\n"))
+            if len(lines) >= count:
+                break
+    return lines
@@ -0,0 +1,289 @@
+import atexit
+import itertools
+import os
+import signal
+import subprocess
+import threading
+import time
+
+# How often the reaper thread polls jobs, checks limits and expired sessions
+REAP_INTERVAL = 1.0
+
+# Seconds a job gets to exit after SIGTERM before it is killed
+STOP_GRACE = 5.0
+
+# A session must be gone this long before its jobs count as orphaned,
+# so a reconnect or a page reload in progress does not kill anything
+SESSION_GRACE = 120
+
+# Finished jobs are kept this long so the Jobs page can still show them
+KEEP_FINISHED = 600
+
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK")
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+
+
+class Job:
+    """A detached helper process owned by the supervisor."""
+
+    def __init__(self, job_id, name, process, session_id, max_runtime, cleanup, on_exit):
+        self.job_id = job_id
+        self.name = name
+        self.process = process
+        self.pid = process.pid
+        self.session_id = session_id
+        self.max_runtime = max_runtime
+        self.cleanup = list(cleanup or [])
+        self.on_exit = on_exit
+        self.started_at = time.time()
+        self.finished_at = None
+        self.returncode = None
+        self.reason = None
+        self.spawn_ns = None
+        self.cgroup = None
+        self.on_stop = None
+        self.usage = None
+        self._cpu_sample = None
+
+    @property
+    def running(self):
+        return self.returncode is None
+
+    @property
+    def runtime(self):
+        return (self.finished_at or time.time()) - self.started_at
+
+
+def _group_usage(pgid):
+    """Returns (cpu_seconds, rss_bytes) summed over every live process in a process group."""
+    cpu = 0.0
+    rss = 0
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # The command name may contain spaces, fields start after the last ')'
+                fields = f.read().rsplit(")", 1)[1].split()
+        except OSError:
+            continue
+        if int(fields[2]) != pgid:
+            continue
+        cpu += (int(fields[11]) + int(fields[12])) / CLOCK_TICKS
+        rss += int(fields[21]) * PAGE_SIZE
+    return cpu, rss
+
+
+class JobSupervisor:
+    """
+    Owns every long-lived helper process started from the pages.
+
+    Jobs run in their own process group, are reaped as soon as they exit and
+    are stopped once they exceed their wall-clock limit. Cleanup commands run
+    when a job ends, and session cleanups run when the browser session that
+    registered them expires or the server shuts down.
+
+    Args:
+        is_session_alive (callable): Takes a session id and returns False once it has expired.
+    """
+
+    def __init__(self, is_session_alive=None):
+        self.is_session_alive = is_session_alive
+        self._jobs = {}
+        self._session_cleanups = {}
+        self._gone_since = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.RLock()
+        self._stopped = threading.Event()
+
+        self._reaper = threading.Thread(target=self._reap_loop, daemon=True)
+        self._reaper.start()
+        atexit.register(self.shutdown)
+
+    # --- LAUNCHING ---
+    def launch(self, name, command_list, session_id=None, max_runtime=None, cleanup=None, on_exit=None, cgroup=None, **popen_kwargs):
+        """
+        Starts a command in its own process group and returns its job id.
+        Args:
+            name (str): Label shown on the Jobs page.
+            command_list (list): The command to run.
+            session_id (str): Browser session that owns the job.
+            max_runtime (float): Wall-clock limit in seconds, None for no limit.
+            cleanup (list): Commands (lists of strings) to run once the job has ended.
+            on_exit (callable): Called with the Job once it has ended.
+            cgroup (Cgroup): Confines the job, its usage is in `job.usage` when on_exit runs.
+        """
+        popen_kwargs.setdefault("stdout", subprocess.DEVNULL)
+        popen_kwargs.setdefault("stderr", subprocess.DEVNULL)
+        spawn_start = time.perf_counter_ns()
+        try:
+            process = subprocess.Popen(cgroup.argv(command_list) if cgroup else command_list, start_new_session=True, **popen_kwargs)
+        except BaseException:
+            if cgroup is not None:
+                cgroup.collect()
+            raise
+        spawn_ns = time.perf_counter_ns() - spawn_start
+        return self.adopt(name, process, session_id, max_runtime, cleanup, on_exit, spawn_ns, cgroup)
+
+    def adopt(self, name, process, session_id=None, max_runtime=None, cleanup=None, on_exit=None, spawn_ns=None, cgroup=None,
+              on_stop=None):
+        """
+        Puts an already started Popen (in its own process group) under supervision.
+        `spawn_ns` is how long the Popen call took, if the caller measured it,
+        `cgroup` the Cgroup it runs in, collected once it has ended.
+        `on_stop` is called with the job right before it is terminated on purpose,
+        from the Jobs page, by its time limit or because its session expired.
+        """
+        with self._lock:
+            job_id = next(self._ids)
+            job = Job(job_id, name, process, session_id, max_runtime, cleanup, on_exit)
+            job.spawn_ns = spawn_ns
+            job.cgroup = cgroup
+            job.on_stop = on_stop
+            self._jobs[job_id] = job
+        return job_id
+
+    # --- CONTROL ---
+    def stop(self, job_id, reason="stopped"):
+        """Sends SIGTERM to the job's process group and SIGKILL if it is still alive after STOP_GRACE."""
+        job = self.get(job_id)
+        if job is None or not job.running:
+            return False
+        if job.on_stop is not None:
+            try:
+                job.on_stop(job)
+            except Exception:
+                pass
+        try:
+            os.killpg(job.pid, signal.SIGTERM)
+            job.process.wait(timeout=STOP_GRACE)
+        except subprocess.TimeoutExpired:
+            os.killpg(job.pid, signal.SIGKILL)
+            job.process.wait()
+        except ProcessLookupError:
+            pass
+        self._finish(job, reason)
+        return True
+
+    def register_session_cleanup(self, session_id, key, command_lists):
+        """Remembers commands to run when `session_id` expires, e.g. restoring networking."""
+        with self._lock:
+            self._session_cleanups.setdefault(session_id, {})[key] = command_lists
+
+    def unregister_session_cleanup(self, session_id, key):
+        with self._lock:
+            self._session_cleanups.get(session_id, {}).pop(key, None)
+
+    def shutdown(self):
+        """Stops every job and runs every pending cleanup. Registered with atexit."""
+        self._stopped.set()
+        for job in self.list_jobs():
+            if job.running:
+                self.stop(job.job_id, reason="shutdown")
+        with self._lock:
+            sessions = list(self._session_cleanups)
+        for session_id in sessions:
+            self._run_session_cleanups(session_id)
+
+    # --- QUERIES ---
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def is_running(self, job_id):
+        job = self.get(job_id)
+        return job is not None and job.running
+
+    def list_jobs(self, session_id=None):
+        with self._lock:
+            jobs = list(self._jobs.values())
+        if session_id is not None:
+            jobs = [j for j in jobs if j.session_id == session_id]
+        return jobs
+
+    def usage(self, job):
+        """Returns (cpu_percent, rss_bytes) for a running job, CPU is averaged since the previous call."""
+        if not job.running:
+            return 0.0, 0
+        cpu, rss = _group_usage(job.pid)
+        now = time.monotonic()
+        previous = job._cpu_sample
+        job._cpu_sample = (now, cpu)
+        if previous is None or now <= previous[0]:
+            return cpu / max(job.runtime, 1e-6) * 100, rss
+        return (cpu - previous[1]) / (now - previous[0]) * 100, rss
+
+    # --- INTERNALS ---
+    def _finish(self, job, reason):
+        with self._lock:
+            if not job.running:
+                return
+            job.returncode = job.process.wait()
+            job.finished_at = time.time()
+            job.reason = reason
+        # Runs on the reaper thread, a failing step must not skip the others or kill the thread
+        if job.cgroup is not None:
+            try:
+                job.usage = job.cgroup.collect()
+            except Exception:
+                pass
+        for command in job.cleanup:
+            _run_quietly(command)
+        if job.on_exit is not None:
+            try:
+                job.on_exit(job)
+            except Exception:
+                pass
+
+    def _run_session_cleanups(self, session_id):
+        with self._lock:
+            cleanups = self._session_cleanups.pop(session_id, {})
+        for command_lists in cleanups.values():
+            for command in command_lists:
+                _run_quietly(command)
+
+    def _reap_loop(self):
+        while not self._stopped.wait(REAP_INTERVAL):
+            now = time.time()
+            for job in self.list_jobs():
+                try:
+                    self._reap(job, now)
+                except Exception:
+                    pass  # e.g. EPERM from killpg, the job is tried again on the next pass
+
+            with self._lock:
+                sessions = list(self._session_cleanups)
+            for session_id in sessions:
+                try:
+                    if self._session_expired(session_id):
+                        self._run_session_cleanups(session_id)
+                except Exception:
+                    pass
+
+    def _reap(self, job, now):
+        if job.running:
+            if job.process.poll() is not None:
+                self._finish(job, "exited")
+            elif job.max_runtime and job.runtime > job.max_runtime:
+                self.stop(job.job_id, reason="time limit")
+            elif job.session_id and self._session_expired(job.session_id):
+                self.stop(job.job_id, reason="session expired")
+        elif now - job.finished_at > KEEP_FINISHED:
+            with self._lock:
+                self._jobs.pop(job.job_id, None)
+
+    def _session_expired(self, session_id):
+        if self.is_session_alive is None:
+            return False
+        if self.is_session_alive(session_id):
+            self._gone_since.pop(session_id, None)
+            return False
+        gone_since = self._gone_since.setdefault(session_id, time.time())
+        return time.time() - gone_since > SESSION_GRACE
+
+
+def _run_quietly(command_list, timeout=30):
+    try:
+        subprocess.run(command_list, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=timeout)
+    except Exception:
+        pass
@@ -0,0 +1,201 @@
+import bisect
+import http.client
+import json
+import math
+import time
+from array import array
+from urllib.parse import urlsplit
+
+# Histogram buckets: log-spaced from 10 µs to ~100 s, 20 per decade (~12% wide)
+BUCKETS_PER_DECADE = 20
+MIN_NS = 10_000
+BUCKET_EDGES = [int(MIN_NS * 10 ** (i / BUCKETS_PER_DECADE)) for i in range(7 * BUCKETS_PER_DECADE + 1)]
+
+
+class LatencyHistogram:
+    """Fixed log-scale histogram, so percentiles cost O(buckets) however many samples were added."""
+
+    def __init__(self):
+        self.counts = array("L", [0] * (len(BUCKET_EDGES) + 1))
+        self.total = 0
+
+    def add(self, ns):
+        self.counts[bisect.bisect_right(BUCKET_EDGES, ns)] += 1
+        self.total += 1
+
+    def percentile(self, p):
+        """Returns the upper edge (ns) of the bucket holding the p-th percentile, None when empty."""
+        if not self.total:
+            return None
+        rank = math.ceil(self.total * p / 100)
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return BUCKET_EDGES[min(index, len(BUCKET_EDGES) - 1)]
+        return BUCKET_EDGES[-1]
+
+    def bins(self):
+        """Non-empty buckets as (upper edge in ms, count)."""
+        return [
+            (BUCKET_EDGES[min(i, len(BUCKET_EDGES) - 1)] / 1e6, c)
+            for i, c in enumerate(self.counts) if c
+        ]
+
+
+class LatencySeries:
+    """
+    Samples of one monitoring run, stored in flat typed arrays.
+
+    Connect, time-to-first-byte and total times are kept apart in
+    nanoseconds. A connect time of -1 means the request reused a kept-alive
+    connection. Failed requests have status 0 and are left out of the
+    histograms.
+    """
+
+    PHASES = ("connect", "ttfb", "total")
+
+    def __init__(self, url="", rate=0.0, keep_alive=False):
+        self.url = url
+        self.rate = rate
+        self.keep_alive = keep_alive
+        self.started_at = time.time()
+        self.offset_ns = array("q")
+        self.connect_ns = array("q")
+        self.ttfb_ns = array("q")
+        self.total_ns = array("q")
+        self.status = array("H")
+        self.histograms = {phase: LatencyHistogram() for phase in self.PHASES}
+
+    def __len__(self):
+        return len(self.status)
+
+    def add(self, offset_ns, connect_ns, ttfb_ns, total_ns, status):
+        self.offset_ns.append(offset_ns)
+        self.connect_ns.append(connect_ns)
+        self.ttfb_ns.append(ttfb_ns)
+        self.total_ns.append(total_ns)
+        self.status.append(status)
+        if status:
+            if connect_ns >= 0:
+                self.histograms["connect"].add(connect_ns)
+            self.histograms["ttfb"].add(ttfb_ns)
+            self.histograms["total"].add(total_ns)
+
+    @property
+    def failures(self):
+        return self.status.count(0)
+
+    def summary(self):
+        """p50/p95/p99 in ms for each phase."""
+        return {
+            phase: {f"p{p}": _ms(hist.percentile(p)) for p in (50, 95, 99)}
+            for phase, hist in self.histograms.items()
+        }
+
+    # --- PERSISTENCE ---
+    def to_json(self):
+        return json.dumps({
+            "url": self.url,
+            "rate": self.rate,
+            "keep_alive": self.keep_alive,
+            "started_at": self.started_at,
+            "offset_ns": list(self.offset_ns),
+            "connect_ns": list(self.connect_ns),
+            "ttfb_ns": list(self.ttfb_ns),
+            "total_ns": list(self.total_ns),
+            "status": list(self.status),
+        })
+
+    @classmethod
+    def from_json(cls, text):
+        data = json.loads(text)
+        series = cls(data["url"], data["rate"], data["keep_alive"])
+        series.started_at = data["started_at"]
+        for row in zip(data["offset_ns"], data["connect_ns"], data["ttfb_ns"], data["total_ns"], data["status"]):
+            series.add(*row)
+        return series
+
+
+def _ms(ns):
+    return None if ns is None else round(ns / 1e6, 3)
+
+
+class HttpProbe:
+    """
+    Times single GET requests with perf_counter_ns.
+
+    With keep_alive the TCP (and TLS) connection is reused, so after the
+    first request the samples show server time without connection setup.
+
+    Args:
+        url (str): Target URL, http or https. Without a scheme http:// is assumed.
+        keep_alive (bool): Reuse one connection across requests.
+        timeout (float): Socket timeout in seconds.
+
+    Raises ValueError for a URL without a host or with an invalid port.
+    """
+
+    def __init__(self, url, keep_alive=False, timeout=2.0):
+        url = url.strip()
+        if "://" not in url:
+            url = f"http://{url}"  # "localhost:8080" would otherwise parse as scheme "localhost"
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            raise ValueError(f"'{url}' is not an http(s) URL with a host")
+        self.url = url
+        self.https = parts.scheme == "https"
+        self.host = parts.hostname
+        self.port = parts.port
+        self.path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+        self.keep_alive = keep_alive
+        self.timeout = timeout
+        self._conn = None
+
+    def _new_connection(self):
+        cls = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+        return cls(self.host, self.port, timeout=self.timeout)
+
+    def request(self):
+        """Returns (connect_ns, ttfb_ns, total_ns, status). connect_ns is -1 on a reused connection."""
+        start = time.perf_counter_ns()
+        try:
+            connect_ns = -1
+            if self._conn is None:
+                self._conn = self._new_connection()
+                self._conn.connect()
+                connect_ns = time.perf_counter_ns() - start
+
+            headers = {} if self.keep_alive else {"Connection": "close"}
+            self._conn.request("GET", self.path, headers=headers)
+            response = self._conn.getresponse()
+            ttfb_ns = time.perf_counter_ns() - start
+            response.read()
+            total_ns = time.perf_counter_ns() - start
+
+            if not self.keep_alive or response.will_close:
+                self.close()
+            return connect_ns, ttfb_ns, total_ns, response.status
+        except (OSError, http.client.HTTPException):
+            self.close()
+            return -1, 0, time.perf_counter_ns() - start, 0
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+def paced(rate, count):
+    """
+    Yields (index, offset_ns) at a fixed rate of `rate` requests per second.
+    Start times are scheduled from the first tick, so a slow request doesn't shift the rest.
+    """
+    interval_ns = int(1e9 / rate)
+    origin = time.perf_counter_ns()
+    for index in range(count):
+        due = origin + index * interval_ns
+        wait = due - time.perf_counter_ns()
+        if wait > 0:
+            time.sleep(wait / 1e9)
+        yield index, time.perf_counter_ns() - origin
@@ -0,0 +1,276 @@
+import contextlib
+import json
+import os
+import threading
+import time
+from collections import deque
+
+from artifacts import DATA_DIR
+from history import run_status
+from latency import LatencyHistogram
+
+# Exported files (metrics.json, metrics.prom) and the event log live here
+METRICS_DIR = os.environ.get("VISUALHACK_METRICS_DIR", os.path.join(DATA_DIR, "metrics"))
+
+# Recent runs kept in memory for the Metrics page
+MAX_EVENTS = 2000
+
+# The event log is rotated to events.jsonl.1 beyond this size
+EVENTS_MAX_BYTES = 8 * 2**20
+
+# Timings kept as distributions, all in nanoseconds
+TIMINGS = ("spawn", "first_line", "duration", "blocked", "queued")
+
+
+class RunTrace:
+    """
+    Timings of one tool run, filled in by whoever drives the process.
+
+    `blocked` is how long the Streamlit script thread was held by the run,
+    from the call site until control went back to the page, including time
+    spent queued for a scheduler slot (`queued`). `command` is what to spawn,
+    traced() swaps in the cgroup wrapper, and `usage` holds the cgroup's CPU,
+    memory and I/O totals once the run is over.
+
+    Args:
+        argv (list): The command being run.
+        kind (str): "command", "background", "job" or "page" for ad-hoc Popen calls in a page.
+    """
+
+    def __init__(self, argv, kind="page"):
+        self.tool = os.path.basename(argv[0]) if argv else "cmd"
+        self.command = list(argv)
+        self.kind = kind
+        self.started_at = time.time()
+        self.created_ns = time.perf_counter_ns()
+        self.spawned_at_ns = None
+        self.spawn_ns = None
+        self.first_line_ns = None
+        self.duration_ns = None
+        self.blocked_ns = None
+        self.queued_ns = None
+        self.bytes_out = 0
+        self.renders = 0
+        self.returncode = None
+        self.status = None
+        self.error = None
+        self.usage = None
+
+    @contextlib.contextmanager
+    def spawning(self):
+        """Times the Popen call inside the with block, a failed spawn records nothing."""
+        start = time.perf_counter_ns()
+        yield
+        self.spawned_at_ns = start
+        self.spawn_ns = time.perf_counter_ns() - start
+
+    def queued(self, ticket):
+        """Takes the time spent waiting for a scheduler slot from its ticket."""
+        self.queued_ns = int(ticket.waited * 1e9)
+
+    def line(self, text):
+        """Counts one line of output, the first one also fixes time to first output."""
+        if self.first_line_ns is None and self.spawned_at_ns is not None:
+            self.first_line_ns = time.perf_counter_ns() - self.spawned_at_ns
+        self.bytes_out += len(text) + 1
+
+    def output(self, text):
+        """Counts output collected in one piece, e.g. from communicate()."""
+        self.bytes_out += len(text or "")
+
+    def exited(self, returncode, stopped=False):
+        """Records how the run ended, `stopped` marks a process that was terminated on purpose."""
+        self.returncode = returncode
+        self.status = run_status(returncode, stopped)
+        if self.duration_ns is None and self.spawned_at_ns is not None:
+            self.duration_ns = time.perf_counter_ns() - self.spawned_at_ns
+
+    def unblocked(self):
+        """Marks the moment the script thread got control back."""
+        self.blocked_ns = time.perf_counter_ns() - self.created_ns
+
+    def as_event(self):
+        duration_s = (self.duration_ns or 0) / 1e9
+        return {
+            "tool": self.tool,
+            "kind": self.kind,
+            "started_at": self.started_at,
+            "returncode": self.returncode,
+            "status": self.status or run_status(self.returncode),
+            "error": self.error,
+            "spawn_ns": self.spawn_ns,
+            "first_line_ns": self.first_line_ns,
+            "duration_ns": self.duration_ns,
+            "blocked_ns": self.blocked_ns,
+            "queued_ns": self.queued_ns,
+            "bytes_out": self.bytes_out,
+            "bytes_per_s": round(self.bytes_out / duration_s, 1) if duration_s else None,
+            "renders": self.renders,
+            "usage": self.usage,
+        }
+
+
+class _ToolStats:
+    def __init__(self):
+        self.runs = 0
+        self.failed = 0
+        self.stopped = 0
+        self.bytes_out = 0
+        self.renders = 0
+        self.cpu_s = 0.0
+        self.memory_peak = 0
+        self.histograms = {name: LatencyHistogram() for name in TIMINGS}
+        self.sums = dict.fromkeys(TIMINGS, 0)
+
+    def add(self, event):
+        self.runs += 1
+        # Events written before runs had a status only know the return code
+        status = event.get("status") or run_status(event["returncode"])
+        if status == "failed":
+            self.failed += 1
+        elif status == "stopped":
+            self.stopped += 1
+        self.bytes_out += event["bytes_out"]
+        self.renders += event["renders"]
+        usage = event.get("usage") or {}
+        if usage.get("cpu_s") is not None:
+            self.cpu_s += usage["cpu_s"]
+        self.memory_peak = max(self.memory_peak, usage.get("memory_peak") or 0)
+        for name in TIMINGS:
+            value = event[f"{name}_ns"]
+            if value is not None:
+                self.histograms[name].add(value)
+                self.sums[name] += value
+
+
+class MetricsRegistry:
+    """
+    Collects RunTraces from every session and exports them for scraping.
+
+    Each finished run is appended to events.jsonl and folded into per-tool
+    log-scale histograms, after which metrics.json and metrics.prom are
+    rewritten atomically. The event log is replayed on start, so the
+    distributions survive a dashboard restart.
+
+    Args:
+        metrics_dir (str): Directory receiving the event log and the exports.
+    """
+
+    def __init__(self, metrics_dir=METRICS_DIR):
+        self.metrics_dir = metrics_dir
+        self.events_path = os.path.join(metrics_dir, "events.jsonl")
+        self.json_path = os.path.join(metrics_dir, "metrics.json")
+        self.prom_path = os.path.join(metrics_dir, "metrics.prom")
+        self.events = deque(maxlen=MAX_EVENTS)
+        self.tools = {}
+        self._lock = threading.Lock()
+        os.makedirs(metrics_dir, exist_ok=True)
+        self._replay()
+
+    def _replay(self):
+        for path in (self.events_path + ".1", self.events_path):
+            if not os.path.exists(path):
+                continue
+            with open(path, encoding="utf-8") as f:
+                for raw in f:
+                    try:
+                        self._fold(json.loads(raw))
+                    except (ValueError, KeyError):
+                        continue  # Torn last line after a crash
+
+    def _fold(self, event):
+        self.events.append(event)
+        self.tools.setdefault(event["tool"], _ToolStats()).add(event)
+
+    # --- RECORDING ---
+    def record(self, trace):
+        """Adds a finished run and refreshes the export files."""
+        event = trace.as_event()
+        with self._lock:
+            self._fold(event)
+            if os.path.exists(self.events_path) and os.path.getsize(self.events_path) > EVENTS_MAX_BYTES:
+                os.replace(self.events_path, self.events_path + ".1")
+            with open(self.events_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(event) + "\n")
+            self._write(self.json_path, json.dumps(self._summary_locked(), indent=1))
+            self._write(self.prom_path, self._prometheus_locked())
+
+    @staticmethod
+    def _write(path, text):
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp, path)
+
+    # --- READING ---
+    def recent(self, limit=200):
+        with self._lock:
+            return list(self.events)[-limit:][::-1]
+
+    def histogram(self, tool, timing):
+        """Non-empty buckets of one tool's timing as (upper edge in ms, count)."""
+        with self._lock:
+            stats = self.tools.get(tool)
+            return stats.histograms[timing].bins() if stats else []
+
+    def summary(self):
+        with self._lock:
+            return self._summary_locked()
+
+    def _summary_locked(self):
+        tools = {}
+        for tool, stats in sorted(self.tools.items()):
+            tools[tool] = {
+                "runs": stats.runs,
+                "failed": stats.failed,
+                "stopped": stats.stopped,
+                "bytes_out": stats.bytes_out,
+                "renders": stats.renders,
+                "cpu_s": round(stats.cpu_s, 3),
+                "memory_peak_bytes": stats.memory_peak,
+                **{
+                    f"{name}_ms": {f"p{p}": _ms(stats.histograms[name].percentile(p)) for p in (50, 95, 99)}
+                    for name in TIMINGS
+                },
+            }
+        return {"generated_at": time.time(), "tools": tools}
+
+    def prometheus(self):
+        with self._lock:
+            return self._prometheus_locked()
+
+    def _prometheus_locked(self):
+        lines = []
+
+        def counter(name, help_text, attr):
+            lines.extend([f"# HELP visualhack_{name} {help_text}", f"# TYPE visualhack_{name} counter"])
+            for tool, stats in sorted(self.tools.items()):
+                lines.append(f'visualhack_{name}{{tool="{tool}"}} {getattr(stats, attr)}')
+
+        counter("runs_total", "Tool runs recorded.", "runs")
+        counter("failed_runs_total", "Tool runs that did not exit with 0 and were not stopped.", "failed")
+        counter("stopped_runs_total", "Tool runs terminated on purpose (Stop, time limit, scan duration).", "stopped")
+        counter("output_bytes_total", "Bytes of output read from tools.", "bytes_out")
+        counter("ui_renders_total", "Redraws of live output while tools ran.", "renders")
+        counter("cpu_seconds_total", "CPU time used by tool runs, read from their cgroups.", "cpu_s")
+
+        lines.extend(["# HELP visualhack_memory_peak_bytes Highest peak memory of a single run.", "# TYPE visualhack_memory_peak_bytes gauge"])
+        for tool, stats in sorted(self.tools.items()):
+            lines.append(f'visualhack_memory_peak_bytes{{tool="{tool}"}} {stats.memory_peak}')
+
+        for name in TIMINGS:
+            metric = f"visualhack_{name}_seconds"
+            lines.extend([f"# HELP {metric} {name.replace('_', ' ').capitalize()} time per run.", f"# TYPE {metric} summary"])
+            for tool, stats in sorted(self.tools.items()):
+                hist = stats.histograms[name]
+                for q in (0.5, 0.95, 0.99):
+                    value = hist.percentile(q * 100)
+                    if value is not None:
+                        lines.append(f'{metric}{{tool="{tool}",quantile="{q}"}} {value / 1e9:.6f}')
+                lines.append(f'{metric}_sum{{tool="{tool}"}} {stats.sums[name] / 1e9:.6f}')
+                lines.append(f'{metric}_count{{tool="{tool}"}} {hist.total}')
+        return "\n".join(lines) + "\n"
+
+
+def _ms(ns):
+    return None if ns is None else round(ns / 1e6, 3)
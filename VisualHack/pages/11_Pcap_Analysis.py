@@ -0,0 +1,133 @@
+import time
+page_started = time.perf_counter()
+
+import streamlit as st
+import shutil
+import os
+from datetime import datetime
+from artifacts import file_digest
+from utils import scheduled, traced, get_artifact_store, get_environment, page_startup
+from pcap_params import DEFAULT_PARAMS
+
+st.set_page_config(page_title="Pcap Analysis", page_icon="🧪", layout="wide")
+
+st.header("🧪 Offline Pcap Analysis")
+st.markdown("Replays a saved capture through **tshark** and looks for ARP spoofing (IP→MAC binding changes, gratuitous ARP bursts) and SYN floods.")
+
+# --- CHECK DEPENDENCY ---
+if not get_environment().has("tshark"):
+    st.error("❌ 'tshark' is not installed. Please run: `sudo apt install tshark`")
+    st.stop()
+
+page_startup("Pcap Analysis", page_started)
+
+artifacts = get_artifact_store()
+
+# --- INPUT SECTION ---
+source = st.radio("Capture", ["Path on disk", "Upload"], horizontal=True,
+                  help="Multi-GB captures should be given by path, uploads are held in memory by the browser session")
+
+pcap_path = None
+if source == "Path on disk":
+    pcap_path = st.text_input("Pcap / pcapng file", placeholder="/root/captures/lab.pcapng").strip() or None
+else:
+    uploaded = st.file_uploader("Capture file", type=["pcap", "pcapng", "cap"])
+    if uploaded is not None:
+        # Keep one copy per upload in the artifact store, tshark needs a real file
+        if st.session_state.get("pcap_upload_name") != (uploaded.name, uploaded.size):
+            run_dir = artifacts.new_run("pcap_upload")
+            path = artifacts.path(run_dir, os.path.basename(uploaded.name))
+            with open(path, "wb") as f:
+                shutil.copyfileobj(uploaded, f, 2**20)
+            artifacts.refresh(path)
+            st.session_state.pcap_upload_name = (uploaded.name, uploaded.size)
+            st.session_state.pcap_upload_path = path
+        pcap_path = st.session_state.pcap_upload_path
+
+with st.expander("Detection Thresholds"):
+    col1, col2 = st.columns(2)
+    with col1:
+        window = st.number_input("Sliding window (s)", 1, 300, DEFAULT_PARAMS["window"])
+        garp_burst = st.number_input("Gratuitous ARPs per window from one sender", 1, 10000, DEFAULT_PARAMS["garp_burst"])
+    with col2:
+        syn_min = st.number_input("SYNs per window before a destination is judged", 1, 1_000_000, DEFAULT_PARAMS["syn_min"])
+        synack_ratio = st.slider("Flag when SYN-ACK/SYN falls below", 0.0, 1.0, DEFAULT_PARAMS["synack_ratio"], 0.05)
+    force = st.checkbox("Ignore cached results")
+
+params = dict(window=int(window), garp_burst=int(garp_burst), syn_min=int(syn_min), synack_ratio=float(synack_ratio))
+
+# --- EXECUTION LOGIC ---
+if st.button("🔍 Analyze Capture"):
+    if not pcap_path or not os.path.isfile(pcap_path):
+        st.error("Please give an existing capture file.")
+        st.stop()
+
+    # numpy and pandas are only loaded once there is something to analyze
+    from pcap_analysis import analyze_pcap, find_cached, save_result, tshark_command
+
+    with st.status("Analyzing capture...", expanded=True) as status:
+        st.write(f"Hashing `{pcap_path}` ({os.path.getsize(pcap_path) / 2**20:.1f} MB)...")
+        digest = file_digest(pcap_path)
+        result = None if force else find_cached(artifacts, digest, params)
+
+        if result is not None:
+            status.update(label="✅ Loaded cached analysis of this capture", state="complete")
+        else:
+            counter = st.empty()
+            try:
+                with traced(tshark_command(pcap_path)) as trace, scheduled("tshark") as ticket:
+                    trace.queued(ticket)
+                    result = analyze_pcap(pcap_path, params, progress=lambda rows: counter.write(f"📦 {rows:,} packets processed"), trace=trace)
+            except RuntimeError as e:
+                status.update(label="❌ tshark failed", state="error")
+                st.error(str(e))
+                st.stop()
+            save_result(artifacts, digest, params, result)
+            status.update(label=f"✅ Analyzed {result['rows']:,} packets", state="complete")
+
+    st.session_state.pcap_result = dict(result, file=pcap_path, digest=digest)
+
+# --- RESULTS ---
+result = st.session_state.get("pcap_result")
+if result:
+    import pandas as pd
+
+    st.markdown("---")
+    span = ""
+    if result["first_ts"] is not None:
+        span = f" · {datetime.fromtimestamp(result['first_ts']):%Y-%m-%d %H:%M:%S} → {datetime.fromtimestamp(result['last_ts']):%H:%M:%S}"
+    st.caption(f"`{result['file']}` · {result['rows']:,} ARP/SYN packets{span}")
+
+    col1, col2, col3 = st.columns(3)
+    col1.metric("IP→MAC changes", result["binding_changes"])
+    col2.metric("Gratuitous ARP bursts", len(result["garp_bursts"]))
+    col3.metric("SYN-flooded hosts", len(result["syn_floods"]))
+
+    st.subheader("🕵️ ARP Spoofing")
+    if result["binding_events"]:
+        events = pd.DataFrame(result["binding_events"])
+        events["time"] = pd.to_datetime(events["time"], unit="s")
+        st.dataframe(events, use_container_width=True, hide_index=True)
+        if result["binding_changes"] > len(events):
+            st.caption(f"Showing the first {len(events)} of {result['binding_changes']} changes.")
+    else:
+        st.success("No IP→MAC binding changed during the capture.")
+
+    if result["garp_bursts"]:
+        bursts = pd.DataFrame(result["garp_bursts"])
+        bursts["window_start"] = pd.to_datetime(bursts["window_start"], unit="s")
+        st.warning(f"⚠️ {len(bursts)} sender(s) sent bursts of gratuitous ARPs.")
+        st.dataframe(bursts, use_container_width=True, hide_index=True)
+
+    with st.expander(f"Final ARP table ({len(result['bindings'])} entries)"):
+        st.dataframe(pd.DataFrame(result["bindings"].items(), columns=["IP", "MAC"]), use_container_width=True, hide_index=True)
+
+    st.subheader("🌊 SYN Floods")
+    if result["syn_floods"]:
+        floods = pd.DataFrame(result["syn_floods"])
+        floods["worst_window_start"] = pd.to_datetime(floods["worst_window_start"], unit="s")
+        st.error(f"🚨 {len(floods)} destination(s) received SYNs they did not answer.")
+        st.dataframe(floods, use_container_width=True, hide_index=True)
+        st.bar_chart(floods.set_index("destination")[["syn_in_window", "synack_in_window"]])
+    else:
+        st.success(f"No destination got more than {result['params']['syn_min']} unanswered SYNs in a {result['params']['window']}s window.")
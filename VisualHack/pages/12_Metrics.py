@@ -0,0 +1,99 @@
+import time
+page_started = time.perf_counter()
+
+import streamlit as st
+import json
+from datetime import datetime
+from metrics import TIMINGS
+from cgroups import format_usage
+from utils import get_metrics, page_startup
+
+st.set_page_config(page_title="Run Metrics", page_icon="📈", layout="wide")
+
+st.header("📈 Run Metrics")
+st.markdown("Spawn latency, time to first output, throughput and UI cost of every tool run, across all sessions.")
+
+metrics = get_metrics()
+page_startup("Run Metrics", page_started)
+
+summary = metrics.summary()["tools"]
+if not summary:
+    st.info("No runs recorded yet. Launch a module and come back.")
+    st.stop()
+
+# --- PER-TOOL SUMMARY ---
+st.subheader("🧰 Per Tool")
+rows = []
+for tool, stats in summary.items():
+    rows.append({
+        "Tool": tool,
+        "Runs": stats["runs"],
+        "Failed": stats["failed"],
+        "Stopped": stats["stopped"],
+        "Spawn p50 (ms)": stats["spawn_ms"]["p50"],
+        "Spawn p95 (ms)": stats["spawn_ms"]["p95"],
+        "First line p50 (ms)": stats["first_line_ms"]["p50"],
+        "Blocked p50 (ms)": stats["blocked_ms"]["p50"],
+        "Blocked p95 (ms)": stats["blocked_ms"]["p95"],
+        "Queued p95 (ms)": stats["queued_ms"]["p95"],
+        "Output (KB)": round(stats["bytes_out"] / 1024, 1),
+        "Renders": stats["renders"],
+        "CPU (s)": stats["cpu_s"],
+        "Max peak memory (MB)": round(stats["memory_peak_bytes"] / 2**20, 1),
+    })
+st.dataframe(rows, hide_index=True, use_container_width=True)
+
+# --- DISTRIBUTIONS ---
+st.subheader("📊 Latency Distribution")
+col1, col2 = st.columns(2)
+with col1:
+    tool = st.selectbox("Tool", list(summary))
+with col2:
+    timing = st.selectbox("Timing", TIMINGS, format_func=lambda t: t.replace("_", " "))
+
+bins = metrics.histogram(tool, timing)
+if bins:
+    st.bar_chart({"Runs": {f"≤{ms:.2f} ms": count for ms, count in bins}})
+    percentiles = summary[tool][f"{timing}_ms"]
+    st.caption(" · ".join(f"{p}: {v} ms" for p, v in percentiles.items()))
+else:
+    st.caption(f"No {timing.replace('_', ' ')} samples for {tool}.")
+
+# --- RECENT RUNS ---
+st.subheader("🕒 Recent Runs")
+
+
+def _ms(ns):
+    return None if ns is None else round(ns / 1e6, 1)
+
+
+st.dataframe(
+    [
+        {
+            "Started": datetime.fromtimestamp(e["started_at"]).strftime("%Y-%m-%d %H:%M:%S"),
+            "Tool": e["tool"],
+            "Kind": e["kind"],
+            "Exit": e["returncode"],
+            "Spawn (ms)": _ms(e["spawn_ns"]),
+            "First line (ms)": _ms(e["first_line_ns"]),
+            "Duration (ms)": _ms(e["duration_ns"]),
+            "Blocked (ms)": _ms(e["blocked_ns"]),
+            "Queued (ms)": _ms(e["queued_ns"]),
+            "Bytes/s": e["bytes_per_s"],
+            "Renders": e["renders"],
+            "Usage": format_usage(e.get("usage")),
+            "Error": e["error"],
+        }
+        for e in metrics.recent(200)
+    ],
+    hide_index=True, use_container_width=True
+)
+
+# --- EXPORT ---
+st.subheader("📤 Export")
+st.caption(f"Rewritten after every run for the lab monitoring to scrape: `{metrics.prom_path}` (Prometheus text) and `{metrics.json_path}` (JSON). Raw events: `{metrics.events_path}`.")
+col1, col2 = st.columns(2)
+with col1:
+    st.download_button("⬇️ metrics.prom", metrics.prometheus(), file_name="metrics.prom", mime="text/plain")
+with col2:
+    st.download_button("⬇️ metrics.json", json.dumps(metrics.summary(), indent=1), file_name="metrics.json", mime="application/json")
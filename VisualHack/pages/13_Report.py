@@ -0,0 +1,93 @@
+import time
+page_started = time.perf_counter()
+
+import streamlit as st
+import os
+from datetime import date, datetime, time as dt_time
+from report import FORMATS, LOG_MAX_BYTES, ReportBuilder
+from utils import get_run_store, get_artifact_store, current_session_id, page_startup
+
+st.set_page_config(page_title="Session Report", page_icon="📝", layout="wide")
+
+st.header("📝 Session Report")
+st.markdown("Collects the runs, Nmap scans, latency series, WiFi scans, capture analyses and logs of a lab session into one **HTML** or **Markdown** report with charts and collapsible raw logs.")
+
+store = get_run_store()
+artifacts = get_artifact_store()
+page_startup("Session Report", page_started)
+
+# Larger reports are not offered as a download, open them from disk instead
+DOWNLOAD_MAX_BYTES = 32 * 2**20
+
+
+def read_report(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+# --- SESSION ---
+col1, col2, col3 = st.columns([3, 2, 2])
+with col1:
+    days = st.date_input("Session between", value=(date.today(), date.today()))
+with col2:
+    from_time = st.time_input("From", value=dt_time.min)
+with col3:
+    until_time = st.time_input("Until", value=dt_time(23, 59))
+
+if len(days) != 2:
+    st.info("Pick the last day of the session.")
+    st.stop()
+
+since = datetime.combine(days[0], from_time).timestamp()
+until = datetime.combine(days[1], until_time).timestamp() + 60
+only_mine = st.toggle("Only runs from this browser session", help="Artifacts are included when they were created while one of its runs was going")
+
+# --- OPTIONS ---
+col1, col2, col3 = st.columns([3, 2, 2])
+with col1:
+    title = st.text_input("Title", value=f"Lab session {days[0]:%Y-%m-%d}")
+with col2:
+    fmt = st.radio("Format", FORMATS, format_func={"html": "HTML", "md": "Markdown"}.get, horizontal=True)
+with col3:
+    log_mb = st.number_input("Raw log per run (MB, 0 = all)", min_value=0, value=LOG_MAX_BYTES // 2**20,
+                             help="Longer logs keep their first and last half")
+
+# --- BUILD ---
+if st.button("📝 Build Report", type="primary"):
+    builder = ReportBuilder(store, artifacts, log_max_bytes=log_mb * 2**20)
+    with st.status("Building report...", expanded=True) as status:
+        sections = builder.sections(since, until, current_session_id() if only_mine else None)
+        st.write(f"📚 {len(sections)} sections")
+        bar = st.progress(0.0)
+        result = builder.build(sections, fmt, title, progress=lambda done, total, name: bar.progress(done / total, text=name))
+        status.update(label=f"✅ Report built in {result['seconds']:.1f}s", state="complete")
+    st.session_state.report_result = result
+
+result = st.session_state.get("report_result")
+if result and os.path.exists(result["path"]):
+    c1, c2, c3, c4 = st.columns(4)
+    c1.metric("Sections", result["sections"])
+    c2.metric("From cache", result["cached"])
+    c3.metric("Rendered", result["rendered"])
+    c4.metric("Size", f"{result['size'] / 2**20:.1f} MB")
+    if result["failed"]:
+        st.warning(f"⚠️ {result['failed']} sections could not be rendered, see the report for details.")
+    st.caption(f"Saved to `{result['path']}`")
+    if result["size"] <= DOWNLOAD_MAX_BYTES:
+        # The file is only read once the button is clicked, not on every rerun
+        st.download_button("⬇️ Download Report", lambda: read_report(result["path"]), file_name=os.path.basename(result["path"]),
+                           mime="text/html" if result["path"].endswith(".html") else "text/markdown")
+    else:
+        st.info("📦 The report is too large to download through the browser, copy it from the path above.")
+
+# --- EARLIER REPORTS ---
+st.markdown("---")
+st.subheader("🗂️ Earlier Reports")
+earlier = [e for e in artifacts.files(label="report") if os.path.exists(e["path"])]
+if not earlier:
+    st.caption("No reports built yet.")
+else:
+    st.dataframe(
+        [{"Built": datetime.fromtimestamp(e["created_at"]).strftime("%Y-%m-%d %H:%M:%S"),
+          "File": e["name"], "Size (MB)": round((e["size"] or 0) / 2**20, 2), "Path": e["path"]} for e in earlier],
+        hide_index=True, use_container_width=True
+    )
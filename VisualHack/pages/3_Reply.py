@@ -1,6 +1,8 @@
+import time
+page_started = time.perf_counter()
+
 import streamlit as st
-import shutil
-from utils import run_command
+from utils import run_command, get_environment, page_startup
 
 st.set_page_config(page_title="IoT Replay Attack", page_icon="📡")
 
@@ -8,10 +10,12 @@ st.header("📡 IoT MQTT Replay / Injection")
 st.markdown("This module exploits **Unauthenticated MQTT Brokers**. It injects commands into the target topic, simulating a replay attack where an attacker mimics a legitimate controller.")
 
 # --- CHECK DEPENDENCY ---
-if shutil.which("mosquitto_pub") is None:
+if not get_environment().has("mosquitto_pub"):
     st.error("❌ 'mosquitto_pub' is not found. Install it using: `sudo apt install mosquitto-clients`")
     st.stop()
 
+page_startup("IoT Replay Attack", page_started)
+
 # --- PRESETS ---
 # Dictionary to hold your specific university project targets
 presets = {
@@ -1,12 +1,17 @@
 # File: pages/03_🔥_DoS_Simulation.py
+import time
+page_started = time.perf_counter()
+
 import streamlit as st
-from utils import run_command # Importing the engine we made earlier
+from utils import run_command, page_startup # Importing the engine we made earlier
 
 st.set_page_config(page_title="DoS Simulation", page_icon="🔥")
 
 st.header("🔥 TCP SYN Flood Simulation (hping3)")
 st.warning("⚠️ AUTHORIZED USE ONLY: This module performs a stress test. Ensure you have permission.")
 
+page_startup("DoS Simulation", page_started)
+
 # --- INPUTS ---
 col1, col2 = st.columns(2)
 with col1:
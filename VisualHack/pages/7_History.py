@@ -0,0 +1,103 @@
+import time
+page_started = time.perf_counter()
+
+import streamlit as st
+import json
+import os
+from datetime import datetime, time as dt_time
+from history import read_archived_log
+from utils import get_run_store, page_startup
+
+st.set_page_config(page_title="Run History", page_icon="🗂️", layout="wide")
+
+st.header("🗂️ Run History")
+st.markdown("Every command, background scan and job launched from the dashboard is recorded here with its exit status and compressed log.")
+
+store = get_run_store()
+PAGE_SIZE = 50
+
+page_startup("Run History", page_started)
+
+# --- FILTERS ---
+col1, col2, col3, col4 = st.columns([3, 2, 2, 3])
+with col1:
+    text = st.text_input("Search logs", help='Full-text search, e.g. `open AND 22/tcp` or `"KEY FOUND"`')
+with col2:
+    tool = st.selectbox("Tool", ["All"] + store.tools())
+with col3:
+    status = st.selectbox("Status", ["All", "ok", "failed", "stopped", "running", "lost"])
+with col4:
+    days = st.date_input("Started between", value=(), help="Leave empty for all time")
+
+since = until = None
+if len(days) == 2:
+    since = datetime.combine(days[0], dt_time.min).timestamp()
+    until = datetime.combine(days[1], dt_time.max).timestamp()
+
+filters = dict(
+    text=text.strip() or None,
+    tool=None if tool == "All" else tool,
+    status=None if status == "All" else status,
+    since=since,
+    until=until,
+)
+
+# New filters start over at one page, "Load more" widens the window. The window is queried again on
+# every rerun, so runs that started or ended since are listed with their current status.
+if st.session_state.get("history_filters") != filters:
+    st.session_state.history_filters = filters
+    st.session_state.history_pages = 1
+
+limit = PAGE_SIZE * st.session_state.history_pages
+rows = store.search(limit=limit, **filters)
+exhausted = len(rows) < limit
+st.button("🔄 Refresh")
+
+# --- RESULTS ---
+if not rows:
+    st.info("No runs match these filters.")
+    st.stop()
+
+table = []
+for row in rows:
+    duration = (row["ended_at"] - row["started_at"]) if row["ended_at"] else None
+    table.append({
+        "ID": row["id"],
+        "Started": datetime.fromtimestamp(row["started_at"]).strftime("%Y-%m-%d %H:%M:%S"),
+        "Tool": row["tool"],
+        "Kind": row["kind"],
+        "Status": row["status"],
+        "Exit": row["exit_code"],
+        "Duration (s)": round(duration, 1) if duration is not None else None,
+        "CPU (s)": round(row["cpu_s"], 2) if row["cpu_s"] is not None else None,
+        "Peak memory (MB)": round(row["memory_peak"] / 2**20, 1) if row["memory_peak"] is not None else None,
+        "I/O read (MB)": round(row["io_read"] / 2**20, 1) if row["io_read"] is not None else None,
+        "I/O write (MB)": round(row["io_write"] / 2**20, 1) if row["io_write"] is not None else None,
+        "Command": " ".join(json.loads(row["argv"])),
+    })
+st.dataframe(table, use_container_width=True, hide_index=True)
+
+if not exhausted:
+    if st.button(f"⬇️ Load {PAGE_SIZE} more"):
+        st.session_state.history_pages += 1
+        st.rerun()
+
+# --- LOG VIEWER ---
+st.markdown("---")
+st.subheader("📜 Run Log")
+
+with_logs = [row for row in rows if row["log_path"]]
+if not with_logs:
+    st.caption("None of the listed runs has a captured log.")
+else:
+    selected = st.selectbox(
+        "Run",
+        with_logs,
+        format_func=lambda r: f"#{r['id']} · {r['tool']} · {datetime.fromtimestamp(r['started_at']):%Y-%m-%d %H:%M} · {r['status']}",
+    )
+    if not os.path.exists(selected["log_path"]):
+        st.warning("The archived log for this run has been removed.")
+    else:
+        start = st.number_input("Start at line", min_value=0, value=0, step=500)
+        st.caption(f"{selected['log_bytes']} bytes uncompressed · `{selected['log_path']}`")
+        st.code("\n".join(read_archived_log(selected["log_path"], start, 500)))
@@ -1,7 +1,15 @@
+import time
+page_started = time.perf_counter()
+
 import streamlit as st
-import shutil
 import re
-from utils import run_command
+import os
+from datetime import datetime
+from utils import run_command, command_monitor, get_artifact_store, get_environment, page_startup
+from nmap_results import (
+    NmapXmlTail, port_rows, target_label, save_scan, list_scans,
+    load_scan, find_cached_scan, diff_scans
+)
 
 st.set_page_config(page_title="Network Recon", page_icon="🌐")
 
@@ -9,10 +17,12 @@ st.header("🌐 Network Reconnaissance (Nmap)")
 st.markdown("This module uses **Nmap** to discover hosts and services on the network.")
 
 # --- CHECK DEPENDENCY ---
-if shutil.which("nmap") is None:
+if not get_environment().has("nmap"):
     st.error("❌ 'nmap' is not installed. Please run: `sudo apt install nmap`")
     st.stop()
 
+page_startup("Network Recon", page_started)
+
 # --- INPUT SECTION ---
 col1, col2 = st.columns(2)
 
@@ -33,6 +43,10 @@ with st.expander("Advanced Options"):
     output_file = st.checkbox("Save output to file?")
     filename = st.text_input("Filename", "scan_results.txt") if output_file else None
     no_ping = st.checkbox("Skip Ping (-Pn)", value=True, help="Useful if target blocks ICMP")
+    cache_minutes = st.slider("Reuse results of an identical scan younger than (minutes)", 0, 120, 15)
+    force_rescan = st.checkbox("Force a fresh scan", help="Ignore cached results and run nmap again")
+
+artifacts = get_artifact_store()
 
 # --- EXECUTION LOGIC ---
 if st.button("🚀 Launch Scan"):
@@ -58,12 +72,100 @@ if st.button("🚀 Launch Scan"):
     # Add optional flags
     if no_ping:
         command.append("-Pn")
-        
-    if output_file and filename:
-        command.extend(["-oN", filename])
-        
-    # Add target
-    command.append(target_ip)
-    
-    # Run
-    run_command(command)
+
+    # The cache key is everything that changes what nmap finds
+    flags = command[1:]
+    cached = None
+    if not force_rescan and cache_minutes:
+        cached = find_cached_scan(artifacts, target_ip, scan_profile, flags, ttl=cache_minutes * 60)
+
+    previous = st.session_state.get("background_runs", {}).get("nmap_scan")
+    if cached:
+        st.session_state.nmap_cached = cached
+        # Drop the finished live run so the cached result is the only one shown
+        if previous is not None and previous.done:
+            st.session_state.background_runs.pop("nmap_scan")
+            st.session_state.pop("nmap_live", None)
+    else:
+        st.session_state.nmap_cached = None
+
+        # Every scan of this target lives under the same artifact label
+        run_dir = artifacts.new_run(target_label(target_ip))
+        if output_file and filename:
+            saved_path = artifacts.path(run_dir, filename)
+            command.extend(["-oN", saved_path])
+            st.caption(f"📁 Output will be saved to `{saved_path}`")
+
+        # XML output is parsed while nmap writes it
+        xml_path = artifacts.path(run_dir, "scan.xml")
+        command.extend(["-oX", xml_path])
+
+        # Add target
+        command.append(target_ip)
+
+        # Run in the background so long scans don't freeze the page
+        runner = run_command(command, background=True, key="nmap_scan")
+        if runner is not None and runner is not previous:
+            st.session_state.nmap_live = {
+                "tail": NmapXmlTail(xml_path),
+                "run_dir": run_dir,
+                "target": target_ip,
+                "profile": scan_profile,
+                "flags": flags,
+                "saved": False,
+            }
+
+
+def show_hosts(runner):
+    """Fills the hosts table from the XML written so far, and caches the scan once nmap is done."""
+    live = st.session_state.get("nmap_live")
+    if not live:
+        return
+    tail = live["tail"]
+    tail.poll()
+
+    st.write(f"### 🖥️ Hosts ({len(tail.hosts)} completed)")
+    if tail.hosts:
+        st.dataframe(port_rows(tail.hosts), use_container_width=True, hide_index=True)
+
+    if runner.done and runner.returncode == 0 and not live["saved"]:
+        save_scan(artifacts, live["run_dir"], live["target"], live["profile"], live["flags"], tail.hosts)
+        artifacts.compress(tail.path)
+        live["saved"] = True
+
+
+# Results loaded from the cache instead of re-running nmap
+cached = st.session_state.get("nmap_cached")
+if cached:
+    age = int((time.time() - cached["finished_at"]) / 60)
+    st.success(f"⚡ Loaded from cache: identical scan of {cached['target']} finished {age} min ago. Tick 'Force a fresh scan' to re-run.")
+    st.write(f"### 🖥️ Hosts ({len(cached['hosts'])})")
+    st.dataframe(port_rows(cached["hosts"]), use_container_width=True, hide_index=True)
+
+# Live progress, hosts table and Stop button for the current scan, survives reruns
+command_monitor("nmap_scan", extra=show_hosts)
+
+# --- SCAN DIFF ---
+st.markdown("---")
+st.subheader("🔀 Compare Scans")
+
+scans = list_scans(artifacts, target_ip) if target_ip else []
+if len(scans) < 2:
+    st.caption("Run at least two scans of this target to compare them.")
+else:
+    def describe(entry):
+        return f"{datetime.fromtimestamp(entry['created_at']):%Y-%m-%d %H:%M:%S} · {os.path.basename(entry['run_dir'])}"
+
+    c1, c2 = st.columns(2)
+    with c1:
+        older = st.selectbox("Older scan", scans, index=1, format_func=describe)
+    with c2:
+        newer = st.selectbox("Newer scan", scans, index=0, format_func=describe)
+
+    old_scan, new_scan = load_scan(artifacts, older["path"]), load_scan(artifacts, newer["path"])
+    st.caption(f"{old_scan['profile']} {' '.join(old_scan['flags'])}  →  {new_scan['profile']} {' '.join(new_scan['flags'])}")
+    changes = diff_scans(old_scan, new_scan)
+    if changes:
+        st.dataframe(changes, use_container_width=True, hide_index=True)
+    else:
+        st.success("No changes in hosts or open ports between these scans.")
@@ -1,9 +1,13 @@
+import time
+page_started = time.perf_counter()
+
 import streamlit as st
 import subprocess
-import time
-import requests
-import pandas as pd
-from utils import run_command
+import json
+import os
+from datetime import datetime
+from utils import run_command, get_artifact_store, page_startup
+from latency import LatencySeries, HttpProbe, paced
 
 st.set_page_config(page_title="Availability Check", page_icon="📉")
 
@@ -11,7 +15,9 @@ st.header("📉 Availability & Stress Testing")
 st.markdown("Check if a target is alive (Ping) or test its response under load (HTTP Stress).")
 
 # Tabs for different methods
-tab1, tab2 = st.tabs(["📡 ICMP Ping", "🔥 HTTP Stress Test"])
+tab1, tab2, tab3 = st.tabs(["📡 ICMP Ping", "🔥 HTTP Stress Test", "⏱️ Latency Monitor"])
+
+page_startup("Availability Check", page_started)
 
 # --- TAB 1: SYSTEM PING ---
 with tab1:
@@ -34,6 +40,9 @@ with tab2:
     delay = st.slider("Delay between requests (sec)", 0.0, 2.0, 0.1)
     
     if st.button("🚀 Start Stress Test"):
+        import requests
+        import pandas as pd
+
         st.info(f"Sending {num_requests} requests to {http_target}...")
         
         results = []
@@ -74,3 +83,112 @@ with tab2:
         # Simple Chart
         if "Latency (ms)" in df.columns:
             st.line_chart(df["Latency (ms)"])
+
+# --- TAB 3: LATENCY MONITOR ---
+with tab3:
+    st.subheader("Precision Latency Monitor")
+    st.caption("Requests go out at a fixed rate. Connect, time-to-first-byte and total time are measured separately with a nanosecond clock.")
+
+    c1, c2, c3 = st.columns(3)
+    with c1:
+        mon_target = st.text_input("Target URL", "http://192.168.1.15:80", key="mon_url")
+        keep_alive = st.checkbox("Keep-alive session", value=False, help="Reuse one connection so samples show server time without TCP setup")
+    with c2:
+        mon_rate = st.number_input("Requests per second", min_value=0.1, max_value=50.0, value=5.0, step=0.5)
+        mon_count = st.number_input("Number of requests", min_value=5, max_value=100000, value=200, step=50)
+    with c3:
+        refresh_hz = st.slider("Chart refreshes per second", 0.5, 5.0, 2.0)
+        mon_timeout = st.slider("Timeout (sec)", 0.5, 10.0, 2.0, key="mon_timeout")
+
+    if st.button("⏱️ Start Monitoring"):
+        import pandas as pd
+
+        try:
+            probe = HttpProbe(mon_target, keep_alive=keep_alive, timeout=mon_timeout)
+        except ValueError as e:
+            st.error(f"❌ Invalid target URL: {e}")
+            st.stop()
+        series = LatencySeries(probe.url, mon_rate, keep_alive)
+
+        progress_bar = st.progress(0)
+        stats_area = st.empty()
+        chart_area = st.empty()
+        last_draw = 0.0
+
+        try:
+            for i, offset_ns in paced(mon_rate, int(mon_count)):
+                series.add(offset_ns, *probe.request())
+
+                # Redraw on a time budget, not per request
+                now = time.monotonic()
+                if now - last_draw >= 1 / refresh_hz or i + 1 == mon_count:
+                    last_draw = now
+                    progress_bar.progress((i + 1) / mon_count)
+                    summary = series.summary()
+                    stats_area.dataframe(
+                        [{"Phase": phase, **values} for phase, values in summary.items()],
+                        hide_index=True
+                    )
+                    # Only the latest 500 samples are charted live
+                    tail = slice(max(0, len(series) - 500), len(series))
+                    chart_area.line_chart(pd.DataFrame({
+                        "TTFB (ms)": [ns / 1e6 for ns in series.ttfb_ns[tail]],
+                        "Total (ms)": [ns / 1e6 for ns in series.total_ns[tail]],
+                    }))
+        finally:
+            probe.close()
+
+        st.session_state.latency_series = series
+
+    series = st.session_state.get("latency_series")
+    if series is not None and len(series):
+        import pandas as pd
+
+        st.write(f"### Results: {len(series)} requests, {series.failures} failed")
+
+        hist_phase = st.radio("Histogram", LatencySeries.PHASES, index=2, horizontal=True)
+        bins = series.histograms[hist_phase].bins()
+        if bins:
+            st.bar_chart(pd.DataFrame({"Requests": [c for _, c in bins]}, index=[f"≤{ms:.2f}" for ms, _ in bins]))
+
+        # Save for later comparison
+        save_name = st.text_input("Series name", value=f"{series.url} {'keep-alive' if series.keep_alive else 'fresh'}")
+        if st.button("💾 Save Series"):
+            artifacts = get_artifact_store()
+            path = artifacts.save_text(artifacts.new_run("latency"), "series.json", json.dumps({"name": save_name, "series": series.to_json()}))
+            st.success(f"Saved to `{path}`")
+
+    # --- COMPARE SAVED SERIES ---
+    st.markdown("---")
+    st.write("### 📊 Compare Saved Series")
+    artifacts = get_artifact_store()
+    saved = artifacts.files(label="latency")
+    if not saved:
+        st.caption("No saved series yet.")
+    else:
+        chosen = st.multiselect(
+            "Series",
+            saved,
+            format_func=lambda e: f"{datetime.fromtimestamp(e['created_at']):%Y-%m-%d %H:%M:%S} · {os.path.basename(e['run_dir'])}",
+        )
+        if chosen:
+            import pandas as pd
+
+            rows, totals = [], {}
+            for entry in chosen:
+                if not os.path.exists(entry["path"]):
+                    continue
+                with artifacts.open_text(entry["path"]) as f:
+                    record = json.load(f)
+                loaded = LatencySeries.from_json(record["series"])
+                summary = loaded.summary()
+                rows.append({
+                    "Series": record["name"],
+                    "Requests": len(loaded),
+                    "Failed": loaded.failures,
+                    **{f"{phase} {p}": summary[phase][p] for phase in ("connect", "total") for p in ("p50", "p95", "p99")},
+                })
+                totals[record["name"]] = pd.Series([ns / 1e6 for ns in loaded.total_ns])
+            if rows:
+                st.dataframe(rows, hide_index=True)
+                st.line_chart(pd.DataFrame(totals))
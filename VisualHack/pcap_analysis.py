@@ -0,0 +1,317 @@
+import contextlib
+import hashlib
+import json
+import os
+import socket
+import struct
+import subprocess
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from pcap_params import DEFAULT_PARAMS
+
+# Lines of tshark output turned into column arrays at a time
+CHUNK_ROWS = 200_000
+
+# At most this many individual binding changes are kept for display, the rest are only counted
+MAX_EVENTS = 1000
+
+# Same extraction style as the sniffer in 1_Mitm, but only the fields the detectors need
+TSHARK_FIELDS = [
+    "frame.time_epoch",
+    "arp.opcode",
+    "arp.src.hw_mac",
+    "arp.src.proto_ipv4",
+    "arp.dst.proto_ipv4",
+    "ip.src",
+    "ip.dst",
+    "tcp.flags.syn",
+    "tcp.flags.ack",
+]
+DISPLAY_FILTER = "arp or (tcp.flags.syn == 1)"
+
+
+def tshark_command(path):
+    cmd = ["tshark", "-n", "-r", path, "-Y", DISPLAY_FILTER, "-T", "fields", "-E", "separator=\t"]
+    for field in TSHARK_FIELDS:
+        cmd.extend(["-e", field])
+    return cmd
+
+
+def params_key(params):
+    return hashlib.sha1(json.dumps(params, sort_keys=True).encode()).hexdigest()[:10]
+
+
+# --- STRING COLUMNS -> INTEGER COLUMNS ---
+def _ip_to_int(value):
+    try:
+        return struct.unpack("!I", socket.inet_aton(value))[0]
+    except (OSError, TypeError):
+        return 0
+
+
+def _int_to_ip(value):
+    return socket.inet_ntoa(struct.pack("!I", int(value)))
+
+
+def _mac_to_int(value):
+    try:
+        return int(value.replace(":", ""), 16)
+    except (AttributeError, ValueError):
+        return 0
+
+
+def _int_to_mac(value):
+    text = f"{int(value):012x}"
+    return ":".join(text[i:i + 2] for i in range(0, 12, 2))
+
+
+def _encode(column, convert, dtype):
+    """Converts a string column through its distinct values only, so a chunk costs O(unique) Python calls."""
+    codes, uniques = pd.factorize(column, use_na_sentinel=True)
+    table = np.fromiter((convert(u) for u in uniques), dtype=dtype, count=len(uniques))
+    out = np.zeros(len(column), dtype=dtype)
+    valid = codes >= 0
+    out[valid] = table[codes[valid]]
+    return out
+
+
+def _flag(column):
+    return column.isin(("1", "True", "true")).to_numpy()
+
+
+# --- AGGREGATION ---
+class _Counter:
+    """Sparse (key, second) -> count table kept as two sorted uint64/int64 arrays."""
+
+    def __init__(self):
+        self.keys = np.empty(0, dtype=np.uint64)
+        self.counts = np.empty(0, dtype=np.int64)
+
+    def add(self, ids, seconds):
+        if not len(ids):
+            return
+        keys = (ids.astype(np.uint64) << np.uint64(32)) | seconds.astype(np.uint64)
+        keys, counts = np.unique(keys, return_counts=True)
+        merged = np.concatenate([self.keys, keys])
+        weights = np.concatenate([self.counts, counts])
+        self.keys, inverse = np.unique(merged, return_inverse=True)
+        self.counts = np.bincount(inverse, weights=weights).astype(np.int64)
+
+    def split(self):
+        return (self.keys >> np.uint64(32)).astype(np.uint32), (self.keys & np.uint64(0xFFFFFFFF)).astype(np.int64)
+
+
+def _sliding(seconds, counts, start, end, window):
+    """Dense per-second series between start and end, summed over `window` seconds."""
+    dense = np.zeros(end - start + 1, dtype=np.int64)
+    np.add.at(dense, seconds - start, counts)
+    cumulative = np.concatenate([[0], np.cumsum(dense)])
+    width = min(window, len(dense))
+    return cumulative[width:] - cumulative[:-width]
+
+
+class PcapAnalyzer:
+    """
+    Streams tshark field output of a capture through NumPy detectors.
+
+    Rows are ingested in chunks of CHUNK_ROWS. Each chunk is turned into
+    integer column arrays and reduced to per-second counts before the next one
+    is read, so memory depends on the number of distinct (host, second) pairs,
+    not on the size of the capture.
+
+    Detects:
+        - IP→MAC binding changes in ARP traffic (ARP spoofing)
+        - Bursts of gratuitous ARPs from one sender within a sliding window
+        - Destinations receiving many SYNs but answering few of them (SYN flood)
+    """
+
+    def __init__(self, params=None):
+        self.params = dict(DEFAULT_PARAMS, **(params or {}))
+        self.rows = 0
+        self.first_ts = None
+        self.last_ts = None
+        self.bindings = {}
+        self.binding_changes = 0
+        self.events = []
+        self.garp = _Counter()
+        self.syn = _Counter()
+        self.synack = _Counter()
+
+    def feed(self, chunk):
+        """Processes one DataFrame chunk of tshark output (all columns as strings)."""
+        self.rows += len(chunk)
+        ts = pd.to_numeric(chunk["frame.time_epoch"], errors="coerce").to_numpy()
+        ok = ~np.isnan(ts)
+        if not ok.any():
+            return
+        chunk, ts = chunk[ok], ts[ok]
+        self.first_ts = ts.min() if self.first_ts is None else min(self.first_ts, ts.min())
+        self.last_ts = ts.max() if self.last_ts is None else max(self.last_ts, ts.max())
+        seconds = ts.astype(np.int64)
+
+        # --- ARP ---
+        is_arp = chunk["arp.opcode"].notna().to_numpy()
+        if is_arp.any():
+            arp = chunk[is_arp]
+            src_ip = _encode(arp["arp.src.proto_ipv4"], _ip_to_int, np.uint32)
+            dst_ip = _encode(arp["arp.dst.proto_ipv4"], _ip_to_int, np.uint32)
+            mac = _encode(arp["arp.src.hw_mac"], _mac_to_int, np.uint64)
+            self._track_bindings(ts[is_arp], src_ip, mac)
+
+            gratuitous = (src_ip == dst_ip) & (src_ip != 0)
+            self.garp.add(src_ip[gratuitous], seconds[is_arp][gratuitous])
+
+        # --- TCP handshakes ---
+        syn_flag = _flag(chunk["tcp.flags.syn"])
+        ack_flag = _flag(chunk["tcp.flags.ack"])
+        pure_syn = syn_flag & ~ack_flag
+        syn_ack = syn_flag & ack_flag
+        if pure_syn.any():
+            self.syn.add(_encode(chunk["ip.dst"][pure_syn], _ip_to_int, np.uint32), seconds[pure_syn])
+        if syn_ack.any():
+            # The server answers from the address the SYNs went to
+            self.synack.add(_encode(chunk["ip.src"][syn_ack], _ip_to_int, np.uint32), seconds[syn_ack])
+
+    def _track_bindings(self, ts, ips, macs):
+        valid = (ips != 0) & (macs != 0)
+        ts, ips, macs = ts[valid], ips[valid], macs[valid]
+        if not len(ips):
+            return
+
+        # Group by IP keeping capture order, then compare each row with the previous one of the same IP
+        order = np.lexsort((np.arange(len(ips)), ips))
+        ts, ips, macs = ts[order], ips[order], macs[order]
+        first = np.ones(len(ips), dtype=bool)
+        first[1:] = ips[1:] != ips[:-1]
+
+        previous = np.empty_like(macs)
+        previous[1:] = macs[:-1]
+        # The first row of each IP is compared with what earlier chunks saw
+        first_idx = np.flatnonzero(first)
+        previous[first_idx] = [self.bindings.get(int(ip), int(mac)) for ip, mac in zip(ips[first_idx], macs[first_idx])]
+
+        changed = np.flatnonzero(macs != previous)
+        self.binding_changes += len(changed)
+        for i in changed[:max(0, MAX_EVENTS - len(self.events))]:
+            self.events.append({
+                "time": float(ts[i]),
+                "ip": _int_to_ip(ips[i]),
+                "old_mac": _int_to_mac(previous[i]),
+                "new_mac": _int_to_mac(macs[i]),
+            })
+
+        last_idx = np.append(first_idx[1:] - 1, len(ips) - 1)
+        for ip, mac in zip(ips[last_idx], macs[last_idx]):
+            self.bindings[int(ip)] = int(mac)
+
+    def result(self):
+        """Turns the aggregated counts into findings (plain JSON-serialisable dict)."""
+        window = int(self.params["window"])
+
+        bursts = []
+        ids, secs = self.garp.split()
+        for ip in np.unique(ids):
+            mask = ids == ip
+            sliding = _sliding(secs[mask], self.garp.counts[mask], secs[mask].min(), secs[mask].max(), window)
+            peak = int(sliding.max())
+            if peak >= self.params["garp_burst"]:
+                start = int(secs[mask].min() + sliding.argmax())
+                bursts.append({"sender_ip": _int_to_ip(ip), "peak_per_window": peak, "window_start": start,
+                               "total": int(self.garp.counts[mask].sum())})
+
+        floods = []
+        syn_ids, syn_secs = self.syn.split()
+        ack_ids, ack_secs = self.synack.split()
+        for ip in np.unique(syn_ids):
+            mask = syn_ids == ip
+            if self.syn.counts[mask].sum() < self.params["syn_min"]:
+                continue
+            amask = ack_ids == ip
+            start = int(syn_secs[mask].min())
+            end = int(max(syn_secs[mask].max(), ack_secs[amask].max() if amask.any() else 0))
+            syns = _sliding(syn_secs[mask], self.syn.counts[mask], start, end, window)
+            acks = _sliding(ack_secs[amask & (ack_secs >= start)], self.synack.counts[amask & (ack_secs >= start)], start, end, window)
+            suspicious = (syns >= self.params["syn_min"]) & (acks < syns * self.params["synack_ratio"])
+            if suspicious.any():
+                worst = int(np.argmax(np.where(suspicious, syns - acks, -1)))
+                floods.append({
+                    "destination": _int_to_ip(ip),
+                    "flagged_windows": int(suspicious.sum()),
+                    "worst_window_start": start + worst,
+                    "syn_in_window": int(syns[worst]),
+                    "synack_in_window": int(acks[worst]),
+                    "total_syn": int(self.syn.counts[mask].sum()),
+                    "total_synack": int(self.synack.counts[amask].sum()),
+                })
+
+        return {
+            "params": self.params,
+            "rows": self.rows,
+            "first_ts": None if self.first_ts is None else float(self.first_ts),
+            "last_ts": None if self.last_ts is None else float(self.last_ts),
+            "binding_changes": self.binding_changes,
+            "binding_events": self.events,
+            "bindings": {_int_to_ip(ip): _int_to_mac(mac) for ip, mac in self.bindings.items()},
+            "garp_bursts": sorted(bursts, key=lambda b: -b["peak_per_window"]),
+            "syn_floods": sorted(floods, key=lambda f: -f["syn_in_window"]),
+        }
+
+
+def analyze_pcap(path, params=None, progress=None, trace=None):
+    """
+    Runs tshark over a capture and feeds its output to a PcapAnalyzer chunk by chunk.
+    Args:
+        path (str): pcap/pcapng file.
+        params (dict): Overrides for DEFAULT_PARAMS.
+        progress (callable): Called with the number of rows processed after each chunk.
+        trace (RunTrace): From traced(tshark_command(path)), receives spawn time and exit code.
+    """
+    analyzer = PcapAnalyzer(params)
+    # stderr goes to a file so a chatty tshark can't block on a full pipe while stdout is read
+    errors = tempfile.TemporaryFile()
+    with trace.spawning() if trace else contextlib.nullcontext():
+        proc = subprocess.Popen(trace.command if trace else tshark_command(path), stdout=subprocess.PIPE, stderr=errors)
+    try:
+        reader = pd.read_csv(
+            proc.stdout, sep="\t", header=None, names=TSHARK_FIELDS, dtype=str,
+            chunksize=CHUNK_ROWS, quoting=3, on_bad_lines="skip",
+        )
+        for chunk in reader:
+            analyzer.feed(chunk)
+            if progress is not None:
+                progress(analyzer.rows)
+    except pd.errors.EmptyDataError:
+        pass  # Nothing matched the filter
+    finally:
+        proc.stdout.close()
+        proc.wait()
+        if trace is not None:
+            trace.exited(proc.returncode)
+        errors.seek(0)
+        stderr = errors.read().decode(errors="replace")
+        errors.close()
+    if proc.returncode != 0:
+        raise RuntimeError(stderr.strip() or f"tshark exited with {proc.returncode}")
+    return analyzer.result()
+
+
+# --- RESULT CACHE ---
+def cache_label(digest):
+    return f"pcap_{digest}"
+
+
+def find_cached(artifacts, digest, params):
+    name = f"analysis-{params_key(params)}.json"
+    for entry in artifacts.files(label=cache_label(digest)):
+        if entry["name"].startswith(name) and os.path.exists(entry["path"]):
+            with artifacts.open_text(entry["path"]) as f:
+                return json.load(f)
+    return None
+
+
+def save_result(artifacts, digest, params, result):
+    run_dir = artifacts.new_run(cache_label(digest))
+    return artifacts.save_text(run_dir, f"analysis-{params_key(params)}.json", json.dumps(result))
@@ -0,0 +1,8 @@
+# Detection thresholds of the pcap analysis. Kept apart from pcap_analysis so
+# the page can show them without importing numpy and pandas.
+DEFAULT_PARAMS = {
+    "window": 5,          # sliding window length in seconds
+    "garp_burst": 5,      # gratuitous ARPs from one sender within a window
+    "syn_min": 100,       # SYNs to one destination within a window before it is judged
+    "synack_ratio": 0.5,  # SYN-ACK/SYN below this within a window is flagged
+}
@@ -0,0 +1,584 @@
+import base64
+import collections
+import contextlib
+import csv
+import hashlib
+import html
+import json
+import os
+import shutil
+import threading
+import time
+from datetime import datetime
+
+from artifacts import DATA_DIR, file_digest, open_compressed
+from cgroups import format_usage
+from latency import LatencySeries
+from nmap_results import port_rows
+
+# Rendered sections, reused as long as their inputs are unchanged
+CACHE_DIR = os.path.join(DATA_DIR, "report_cache")
+
+# Cached sections no build has used for this long are removed
+CACHE_MAX_AGE = 14 * 24 * 3600
+
+# Bump when the rendering of a section changes, so cached sections are rebuilt
+RENDER_VERSION = 1
+
+# Raw log kept per run in the report (half from the start, half from the end), 0 keeps all of it
+LOG_MAX_BYTES = int(os.environ.get("VISUALHACK_REPORT_LOG_MB", 2)) * 2**20
+
+# Longer lines are split, so a tool writing no newlines can't be read into memory in one piece
+LINE_MAX_CHARS = 64 * 1024
+
+# Points drawn per chart line, longer series keep the highest value of each bucket
+CHART_POINTS = 600
+
+# Runs fetched from the history per query while collecting a session
+RUN_PAGE = 500
+
+FORMATS = ("html", "md")
+
+PALETTE = ("#1f77b4", "#ff7f0e", "#2ca02c", "#d62728", "#9467bd", "#8c564b")
+
+
+# --- WRITERS ---
+class HtmlWriter:
+    """Writes report elements as HTML to a file object."""
+
+    suffix = "html"
+
+    def __init__(self, out):
+        self.out = out
+
+    def begin(self, title):
+        self.out.write(
+            "<!DOCTYPE html>\n<html><head><meta charset=\"utf-8\">"
+            f"<title>{html.escape(title)}</title>\n<style>"
+            "body{font-family:sans-serif;margin:2em auto;max-width:1100px;color:#222}"
+            "table{border-collapse:collapse;margin:.5em 0 1em;font-size:.9em}"
+            "th,td{border:1px solid #ccc;padding:2px 8px;text-align:left}th{background:#f0f0f0}"
+            "pre{background:#f7f7f7;padding:.5em;overflow-x:auto;font-size:.8em}"
+            "details{margin:.5em 0 1em}summary{cursor:pointer}"
+            "</style></head><body>\n"
+            f"<h1>{html.escape(title)}</h1>\n"
+        )
+
+    def end(self):
+        self.out.write("</body></html>\n")
+
+    def heading(self, text, level=2):
+        self.out.write(f"<h{level}>{html.escape(text)}</h{level}>\n")
+
+    def text(self, text):
+        self.out.write(f"<p>{html.escape(text)}</p>\n")
+
+    def table(self, rows):
+        columns = None
+        for row in rows:
+            if columns is None:
+                columns = list(row)
+                self.out.write("<table><tr>" + "".join(f"<th>{html.escape(str(c))}</th>" for c in columns) + "</tr>\n")
+            self.out.write("<tr>" + "".join(f"<td>{html.escape(_cell(row.get(c)))}</td>" for c in columns) + "</tr>\n")
+        if columns is not None:
+            self.out.write("</table>\n")
+
+    def chart(self, svg, caption):
+        self.out.write(f"<figure>{svg}<figcaption>{html.escape(caption)}</figcaption></figure>\n")
+
+    @contextlib.contextmanager
+    def details(self, summary):
+        self.out.write(f"<details><summary>{html.escape(summary)}</summary>\n")
+        yield
+        self.out.write("</details>\n")
+
+    def code(self, lines):
+        self.out.write("<pre>")
+        for line in lines:
+            self.out.write(html.escape(line) + "\n")
+        self.out.write("</pre>\n")
+
+
+class MarkdownWriter:
+    """Writes report elements as Markdown, with <details> blocks and charts as inline SVG images."""
+
+    suffix = "md"
+
+    def __init__(self, out):
+        self.out = out
+
+    def begin(self, title):
+        self.out.write(f"# {title}\n\n")
+
+    def end(self):
+        pass
+
+    def heading(self, text, level=2):
+        self.out.write(f"{'#' * level} {text}\n\n")
+
+    def text(self, text):
+        self.out.write(f"{text}\n\n")
+
+    def table(self, rows):
+        columns = None
+        for row in rows:
+            if columns is None:
+                columns = list(row)
+                self.out.write("| " + " | ".join(_md_cell(c) for c in columns) + " |\n")
+                self.out.write("|" + "---|" * len(columns) + "\n")
+            self.out.write("| " + " | ".join(_md_cell(row.get(c)) for c in columns) + " |\n")
+        if columns is not None:
+            self.out.write("\n")
+
+    def chart(self, svg, caption):
+        data = base64.b64encode(svg.encode()).decode()
+        self.out.write(f"![{caption}](data:image/svg+xml;base64,{data})\n\n")
+
+    @contextlib.contextmanager
+    def details(self, summary):
+        self.out.write(f"<details><summary>{html.escape(summary)}</summary>\n\n")
+        yield
+        self.out.write("</details>\n\n")
+
+    def code(self, lines):
+        self.out.write("~~~~~text\n")
+        for line in lines:
+            self.out.write(line + "\n")
+        self.out.write("~~~~~\n\n")
+
+
+WRITERS = {"html": HtmlWriter, "md": MarkdownWriter}
+
+
+def _cell(value):
+    if value is None:
+        return ""
+    if isinstance(value, float):
+        return f"{value:g}"
+    return str(value)
+
+
+def _md_cell(value):
+    return _cell(value).replace("|", "\\|").replace("\n", " ")
+
+
+# --- CHARTS ---
+def svg_bars(items, width=640, bar_height=18):
+    """Horizontal bar chart of (label, value) pairs as an SVG string."""
+    items = list(items)
+    label_width = 180
+    top = max((v for _, v in items), default=0) or 1
+    height = len(items) * bar_height + 10
+    parts = [f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" font-family="sans-serif" font-size="11">']
+    for i, (label, value) in enumerate(items):
+        y = 5 + i * bar_height
+        length = (width - label_width - 70) * value / top
+        parts.append(f'<text x="{label_width - 6}" y="{y + 13}" text-anchor="end">{html.escape(str(label)[:30])}</text>')
+        parts.append(f'<rect x="{label_width}" y="{y + 2}" width="{length:.1f}" height="{bar_height - 4}" fill="{PALETTE[0]}"/>')
+        parts.append(f'<text x="{label_width + length + 4:.1f}" y="{y + 13}">{_cell(value)}</text>')
+    parts.append("</svg>")
+    return "".join(parts)
+
+
+def svg_lines(series, width=720, height=260, x_label="", y_label=""):
+    """Line chart of {name: [(x, y), ...]} as an SVG string."""
+    points = [p for line in series.values() for p in line]
+    if not points:
+        return ""
+    x_min, x_max = min(p[0] for p in points), max(p[0] for p in points)
+    y_max = max(p[1] for p in points) or 1
+    left, right, top, bottom = 60, 20, 10, 40
+    plot_w, plot_h = width - left - right, height - top - bottom
+
+    def sx(x):
+        return left + (x - x_min) / ((x_max - x_min) or 1) * plot_w
+
+    def sy(y):
+        return top + plot_h - y / y_max * plot_h
+
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" font-family="sans-serif" font-size="11">',
+        f'<rect x="{left}" y="{top}" width="{plot_w}" height="{plot_h}" fill="none" stroke="#999"/>',
+        f'<text x="{left - 4}" y="{top + 10}" text-anchor="end">{y_max:.4g}</text>',
+        f'<text x="{left - 4}" y="{top + plot_h}" text-anchor="end">0</text>',
+        f'<text x="{left}" y="{height - 22}">{x_min:.4g}</text>',
+        f'<text x="{left + plot_w}" y="{height - 22}" text-anchor="end">{x_max:.4g}</text>',
+        f'<text x="{left + plot_w / 2}" y="{height - 6}" text-anchor="middle">{html.escape(x_label)}</text>',
+        f'<text x="12" y="{top + plot_h / 2}" transform="rotate(-90 12 {top + plot_h / 2})" text-anchor="middle">{html.escape(y_label)}</text>',
+    ]
+    for i, (name, line) in enumerate(series.items()):
+        color = PALETTE[i % len(PALETTE)]
+        coords = " ".join(f"{sx(x):.1f},{sy(y):.1f}" for x, y in line)
+        parts.append(f'<polyline fill="none" stroke="{color}" stroke-width="1" points="{coords}"/>')
+        parts.append(f'<text x="{left + 8}" y="{top + 14 + i * 13}" fill="{color}">{html.escape(name)}</text>')
+    parts.append("</svg>")
+    return "".join(parts)
+
+
+def downsample(xs, ys, points=CHART_POINTS):
+    """Reduces a series to at most `points` (x, y) pairs, keeping the highest y of each bucket."""
+    n = len(ys)
+    if n <= points:
+        return list(zip(xs, ys))
+    best = {}
+    for i in range(n):
+        bucket = i * points // n
+        if bucket not in best or ys[i] > ys[best[bucket]]:
+            best[bucket] = i
+    return [(xs[i], ys[i]) for i in sorted(best.values())]
+
+
+# --- LOGS ---
+def capped_lines(path, max_bytes=LOG_MAX_BYTES):
+    """
+    Yields the lines of a compressed log, streaming.
+    Beyond `max_bytes` only the first and last half of that are kept, with a marker in between.
+    """
+    with open_compressed(path, "rt") as f:
+        lines = (line.rstrip("\n") for line in iter(lambda: f.readline(LINE_MAX_CHARS), ""))
+        if not max_bytes:
+            yield from lines
+            return
+        half = max_bytes // 2
+        used = 0
+        for line in lines:
+            used += len(line) + 1
+            yield line
+            if used >= half:
+                break
+        tail, tail_bytes, skipped = collections.deque(), 0, 0
+        for line in lines:
+            tail.append(line)
+            tail_bytes += len(line) + 1
+            while tail_bytes > half:
+                tail_bytes -= len(tail.popleft()) + 1
+                skipped += 1
+        if skipped:
+            yield f"[... {skipped} lines left out, the full log is in the run history ...]"
+        yield from tail
+
+
+# --- SECTIONS ---
+class Section:
+    """
+    One cacheable part of the report.
+
+    Args:
+        kind (str): What the section shows, e.g. "nmap" or "log".
+        title (str): Shown in progress messages.
+        sources: JSON-serialisable inputs the rendering depends on (rows, options).
+        files (list): Artifacts the section renders, their content goes into the cache key.
+        render (callable): Called with a writer to write the section.
+    """
+
+    def __init__(self, kind, title, sources, render, files=()):
+        self.kind = kind
+        self.title = title
+        self.sources = sources
+        self.files = [f for f in files if os.path.exists(f)]
+        self.render = render
+
+    def key(self, fmt):
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(json.dumps([RENDER_VERSION, fmt, self.kind, self.sources], sort_keys=True, default=str).encode())
+        for path in self.files:
+            digest.update(file_digest(path).encode())
+        return digest.hexdigest()
+
+
+def _when(ts):
+    return datetime.fromtimestamp(ts).strftime("%Y-%m-%d %H:%M:%S") if ts else ""
+
+
+def _load_json(path):
+    with open_compressed(path, "rt") as f:
+        return json.load(f)
+
+
+def _overview_section(runs, since, until, session_id):
+    summary = [
+        {k: run[k] for k in ("id", "tool", "kind", "status", "exit_code", "started_at", "ended_at", "cpu_s", "memory_peak")}
+        for run in runs
+    ]
+
+    def render(w):
+        w.heading("Overview")
+        window = f"{_when(since) or 'the beginning'} to {_when(until) or 'now'}"
+        cpu = sum(r["cpu_s"] or 0 for r in summary)
+        failed = sum(r["status"] == "failed" for r in summary)
+        w.text(f"{len(summary)} runs from {window}, {failed} failed"
+               + (f", {cpu:.1f} s CPU in total" if cpu else "")
+               + (" (one browser session)" if session_id else "") + ".")
+        per_tool = collections.Counter(r["tool"] for r in summary)
+        if per_tool:
+            w.chart(svg_bars(per_tool.most_common()), "Runs per tool")
+        w.table({
+            "ID": r["id"],
+            "Started": _when(r["started_at"]),
+            "Tool": r["tool"],
+            "Kind": r["kind"],
+            "Status": r["status"],
+            "Exit": r["exit_code"],
+            "Duration (s)": round(r["ended_at"] - r["started_at"], 1) if r["ended_at"] else None,
+            "CPU (s)": round(r["cpu_s"], 2) if r["cpu_s"] is not None else None,
+            "Peak memory (MB)": round(r["memory_peak"] / 2**20, 1) if r["memory_peak"] is not None else None,
+        } for r in reversed(summary))
+
+    return Section("overview", "Overview", [since, until, session_id, summary], render)
+
+
+def _nmap_section(entry):
+    def render(w):
+        scan = _load_json(entry["path"])
+        w.heading(f"Nmap: {scan['target']} ({scan['profile']})", 3)
+        w.text(f"Finished {_when(scan['finished_at'])} · flags: {' '.join(scan['flags']) or 'none'} · {len(scan['hosts'])} hosts")
+        open_ports = [(h["address"] or h["hostname"], sum(p["state"] == "open" for p in h["ports"])) for h in scan["hosts"]]
+        open_ports = sorted((p for p in open_ports if p[1]), key=lambda p: -p[1])[:30]
+        if open_ports:
+            w.chart(svg_bars(open_ports), "Open ports per host")
+        w.table(port_rows(scan["hosts"]))
+
+    return Section("nmap", f"Nmap scan {entry['name']}", [entry["path"]], render, [entry["path"]])
+
+
+def _latency_section(entry):
+    def render(w):
+        record = _load_json(entry["path"])
+        series = LatencySeries.from_json(record["series"])
+        w.heading(f"Availability: {record['name']}", 3)
+        w.text(f"{series.url} · {len(series)} requests at {series.rate}/s, {series.failures} failed · "
+               f"{'keep-alive' if series.keep_alive else 'fresh connections'} · started {_when(series.started_at)}")
+        summary = series.summary()
+        w.table({"Phase": phase, **summary[phase]} for phase in series.PHASES)
+        ok = [i for i, status in enumerate(series.status) if status]
+        if ok:
+            line = downsample([series.offset_ns[i] / 1e9 for i in ok], [series.total_ns[i] / 1e6 for i in ok])
+            w.chart(svg_lines({"total": line}, x_label="seconds since start", y_label="ms"), "Total request time (highest per bucket)")
+        bins = series.histograms["total"].bins()
+        if bins:
+            w.chart(svg_bars((f"≤{ms:.2f} ms", count) for ms, count in bins), "Total request time distribution")
+
+    return Section("latency", f"Latency series {os.path.basename(entry['run_dir'])}", [entry["path"]], render, [entry["path"]])
+
+
+def _wifi_section(entry):
+    def rows():
+        with open_compressed(entry["path"], "rt") as f:
+            reader = csv.reader(f, skipinitialspace=True)
+            header = None
+            for row in reader:
+                if not row:
+                    continue
+                if header is None:
+                    header = [c.strip() for c in row]
+                    continue
+                if row[0].strip() == "Station MAC":
+                    break  # Client section
+                record = dict(zip(header, (c.strip() for c in row)))
+                yield {k: record.get(k) for k in ("BSSID", "channel", "Privacy", "Power", "ESSID")}
+
+    def render(w):
+        w.heading(f"WiFi scan {_when(entry['created_at'])}", 3)
+        w.table(rows())
+
+    return Section("wifi", f"WiFi scan {entry['name']}", [entry["path"]], render, [entry["path"]])
+
+
+def _pcap_section(entry):
+    def render(w):
+        result = _load_json(entry["path"])
+        w.heading(f"Capture analysis {_when(entry['created_at'])}", 3)
+        w.text(f"{result['rows']:,} packets from {_when(result['first_ts'])} to {_when(result['last_ts'])} · "
+               f"{result['binding_changes']} IP→MAC binding changes · {len(result['garp_bursts'])} gratuitous ARP bursts · "
+               f"{len(result['syn_floods'])} SYN flood targets")
+        for title, rows in (("SYN floods", result["syn_floods"]), ("Gratuitous ARP bursts", result["garp_bursts"]),
+                            ("Binding changes", result["binding_events"][:200])):
+            if rows:
+                w.heading(title, 4)
+                w.table(rows)
+
+    return Section("pcap", f"Capture analysis {entry['name']}", [entry["path"]], render, [entry["path"]])
+
+
+def _files_section(entries):
+    listing = [{k: e[k] for k in ("label", "name", "size", "created_at", "path")} for e in entries]
+
+    def render(w):
+        w.heading("Other Artifacts")
+        w.table({
+            "Created": _when(e["created_at"]),
+            "Module": e["label"],
+            "File": e["name"],
+            "Size (KB)": round((e["size"] or 0) / 1024, 1),
+            "Path": e["path"],
+        } for e in listing)
+
+    return Section("files", "Other artifacts", listing, render)
+
+
+def _log_section(run, max_bytes):
+    meta = {k: run[k] for k in ("id", "tool", "argv", "status", "exit_code", "started_at", "ended_at", "log_bytes",
+                                "cpu_s", "memory_peak", "io_read", "io_write")}
+
+    def render(w):
+        w.heading(f"#{meta['id']} {meta['tool']} · {meta['status']}", 3)
+        usage = format_usage(meta)
+        w.text(f"{' '.join(json.loads(meta['argv']))} · started {_when(meta['started_at'])} · exit {meta['exit_code']}"
+               + (f" · {usage}" if usage else ""))
+        if not os.path.exists(run["log_path"]):
+            w.text("The archived log of this run has been removed.")
+            return
+        with w.details(f"Raw log ({(meta['log_bytes'] or 0) / 1024:.1f} KB)"):
+            w.code(capped_lines(run["log_path"], max_bytes))
+
+    return Section("log", f"Log of run #{run['id']}", [meta, run["log_path"], max_bytes], render, [run["log_path"]])
+
+
+# --- BUILDER ---
+class ReportBuilder:
+    """
+    Writes an engagement report over the runs and artifacts of a lab session.
+
+    The report is streamed to disk section by section. Each section is
+    rendered once into `cache_dir` under a hash of its inputs and of the
+    artifacts it shows, so rebuilding after one more run only renders the
+    new sections and copies the others. Raw logs are read line by line and
+    capped per run, so memory stays flat however large the logs are.
+
+    Args:
+        store (RunStore): Runs and their archived logs.
+        artifacts (ArtifactStore): Scans, series and captures; receives the finished report.
+        cache_dir (str): Where rendered sections are kept.
+        log_max_bytes (int): Raw log kept per run, 0 for everything.
+    """
+
+    def __init__(self, store, artifacts, cache_dir=CACHE_DIR, log_max_bytes=LOG_MAX_BYTES):
+        self.store = store
+        self.artifacts = artifacts
+        self.cache_dir = cache_dir
+        self.log_max_bytes = log_max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _runs(self, since, until, session_id):
+        # Oldest first, paged so a long session never needs one huge query
+        runs, before = [], None
+        while True:
+            page = self.store.search(since=since, until=until, session_id=session_id, before=before, limit=RUN_PAGE)
+            runs.extend(page)
+            if len(page) < RUN_PAGE:
+                return runs[::-1]
+            before = (page[-1]["started_at"], page[-1]["id"])
+
+    def sections(self, since=None, until=None, session_id=None):
+        """Collects the sections for runs started and artifacts created between `since` and `until`."""
+        runs = self._runs(since, until, session_id)
+        entries = [e for e in self.artifacts.files(since=since, until=until)[::-1] if os.path.exists(e["path"])]
+        if session_id is not None:
+            # Artifacts carry no session, keep those created while one of its runs was going
+            spans = [(r["started_at"], r["ended_at"] or time.time()) for r in runs]
+            entries = [e for e in entries if any(start - 5 <= e["created_at"] <= end + 5 for start, end in spans)]
+
+        sections = [_overview_section(runs, since, until, session_id)]
+        groups = {"nmap": [], "latency": [], "wifi": [], "pcap": []}
+        other = []
+        for entry in entries:
+            label, name = entry["label"], entry["name"]
+            if label.startswith("log_") or label == "report":
+                continue  # Archived run logs come with their run
+            if label.startswith("nmap_") and name.startswith("scan-"):
+                groups["nmap"].append(_nmap_section(entry))
+            elif label == "latency" and name.startswith("series.json"):
+                groups["latency"].append(_latency_section(entry))
+            elif label == "wifi_scan" and ".csv" in name:
+                groups["wifi"].append(_wifi_section(entry))
+            elif label.startswith("pcap_") and name.startswith("analysis-"):
+                groups["pcap"].append(_pcap_section(entry))
+            elif not name.startswith("scan.xml"):
+                other.append(entry)
+
+        for kind, title in (("nmap", "Network Scans"), ("latency", "Availability"), ("wifi", "WiFi Scans"), ("pcap", "Capture Analysis")):
+            if groups[kind]:
+                sections.append(Section("group", title, [title], lambda w, title=title: w.heading(title)))
+                sections.extend(groups[kind])
+        if other:
+            sections.append(_files_section(other))
+
+        logged = [r for r in runs if r["log_path"]]
+        if logged:
+            sections.append(Section("group", "Run Logs", ["Run Logs"], lambda w: w.heading("Run Logs")))
+            sections.extend(_log_section(r, self.log_max_bytes) for r in logged)
+        return sections
+
+    def build(self, sections, fmt="html", title="Engagement Report", progress=None):
+        """
+        Writes the report into a new "report" artifact run and returns a dict with its
+        path, size, and how many sections were rendered, taken from the cache or failed.
+        Args:
+            sections (list): From sections().
+            fmt (str): "html" or "md".
+            title (str): Report heading.
+            progress (callable): Called with (done, total, section title) after each section.
+        """
+        started = time.perf_counter()
+        writer_cls = WRITERS[fmt]
+        run_dir = self.artifacts.new_run("report")
+        path = self.artifacts.path(run_dir, f"report.{writer_cls.suffix}")
+        cached = rendered = failed = 0
+
+        with open(path, "w", encoding="utf-8") as out:
+            writer = writer_cls(out)
+            writer.begin(title)
+            writer.text(f"Generated {_when(time.time())}.")
+            for done, section in enumerate(sections, 1):
+                fragment = os.path.join(self.cache_dir, f"{section.key(fmt)}.{writer_cls.suffix}")
+                if os.path.exists(fragment):
+                    os.utime(fragment)
+                    cached += 1
+                else:
+                    try:
+                        self._render(section, writer_cls, fragment)
+                    except Exception as e:
+                        # A broken or vanished artifact costs its section, not the report
+                        writer.text(f"⚠️ {section.title} could not be rendered: {e}")
+                        failed += 1
+                        continue
+                    rendered += 1
+                with open(fragment, encoding="utf-8") as f:
+                    shutil.copyfileobj(f, out, 2**20)
+                if progress is not None:
+                    progress(done, len(sections), section.title)
+            writer.end()
+
+        self.artifacts.refresh(path)
+        self.prune_cache()
+        return {
+            "path": path,
+            "size": os.path.getsize(path),
+            "sections": len(sections),
+            "cached": cached,
+            "rendered": rendered,
+            "failed": failed,
+            "seconds": time.perf_counter() - started,
+        }
+
+    @staticmethod
+    def _render(section, writer_cls, fragment):
+        # Written next to the final name and renamed, a failed section never leaves a partial fragment
+        tmp = f"{fragment}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                section.render(writer_cls(f))
+            os.replace(tmp, fragment)
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.remove(tmp)
+            raise
+
+    def prune_cache(self):
+        """Removes cached sections no build has used within CACHE_MAX_AGE."""
+        cutoff = time.time() - CACHE_MAX_AGE
+        with os.scandir(self.cache_dir) as entries:
+            for entry in entries:
+                with contextlib.suppress(OSError):
+                    if entry.stat().st_mtime < cutoff:
+                        os.remove(entry.path)
@@ -0,0 +1,220 @@
+import collections
+import contextlib
+import os
+import subprocess
+import tempfile
+import threading
+import time
+
+# Where the full output of every run is spilled to disk
+LOG_DIR = os.path.join(tempfile.gettempdir(), "visualhack_logs")
+
+# How many lines of each stream we keep in memory for the live view
+RING_SIZE = 200
+
+# Longer lines are split, so a tool writing no newlines can't be read into memory in one piece
+MAX_LINE = 64 * 1024
+
+
+class ProcessRunner:
+    """
+    Runs a system command with stdout and stderr drained at the same time.
+
+    Two reader threads empty the pipes so a tool that is chatty on stderr can
+    never fill its pipe and block. Only the last `ring_size` lines of each
+    stream are kept in memory, the complete output goes to a log file on disk.
+
+    Args:
+        command_list (list): A list of strings, e.g., ["nmap", "-sV", "192.168.1.1"]
+        ring_size (int): Number of lines kept in memory per stream.
+        log_dir (str): Directory that receives the spilled log file.
+        trace (RunTrace): Receives spawn time, time to first line and output volume.
+        cgroup (Cgroup): Confines the process, its usage is read back into `usage` once it has exited.
+    """
+
+    def __init__(self, command_list, ring_size=RING_SIZE, log_dir=LOG_DIR, trace=None, cgroup=None):
+        self.command_list = list(command_list)
+        self.stdout_tail = collections.deque(maxlen=ring_size)
+        self.stderr_tail = collections.deque(maxlen=ring_size)
+        self.line_count = 0
+        self.log_dir = log_dir
+        self.log_path = None
+        self.process = None
+        self.returncode = None
+        self.started_at = None
+        self.finished_at = None
+        self.stopped = False
+        self.run_id = None
+        self.trace = trace
+        self.cgroup = cgroup
+        self.usage = None
+
+        self._cond = threading.Condition()
+        self._log_file = None
+        self._readers = []
+        self._on_done = []
+
+    # --- LIFECYCLE ---
+    def start(self, **popen_kwargs):
+        """Spawns the process and the reader threads. Raises FileNotFoundError if the tool is missing."""
+        os.makedirs(self.log_dir, exist_ok=True)
+        tool = os.path.basename(self.command_list[0]) if self.command_list else "cmd"
+        stamp = time.strftime("%Y%m%d_%H%M%S")
+        self.log_path = os.path.join(self.log_dir, f"{tool}-{stamp}-{os.getpid()}-{id(self):x}.log")
+
+        argv = self.cgroup.argv(self.command_list) if self.cgroup else self.command_list
+        try:
+            with self.trace.spawning() if self.trace else contextlib.nullcontext():
+                self.process = subprocess.Popen(
+                    argv,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.PIPE,
+                    stdin=subprocess.DEVNULL,
+                    text=True,
+                    bufsize=1,
+                    errors="replace",
+                    **popen_kwargs
+                )
+        except BaseException:
+            if self.cgroup is not None:
+                self.cgroup.collect()
+            raise
+        self.started_at = time.time()
+        self._log_file = open(self.log_path, "w", encoding="utf-8")
+
+        for stream, tail, prefix in (
+            (self.process.stdout, self.stdout_tail, ""),
+            (self.process.stderr, self.stderr_tail, "[stderr] "),
+        ):
+            reader = threading.Thread(target=self._drain, args=(stream, tail, prefix), daemon=True)
+            reader.start()
+            self._readers.append(reader)
+
+        threading.Thread(target=self._reap, daemon=True).start()
+        return self
+
+    def _drain(self, stream, tail, prefix):
+        # Runs in a reader thread until the pipe is closed
+        for line in iter(lambda: stream.readline(MAX_LINE), ""):
+            line = line.rstrip("\r\n")
+            with self._cond:
+                self._log_file.write(prefix + line + "\n")
+                if self.trace is not None:
+                    self.trace.line(line)
+                if line.strip():
+                    tail.append(line.strip())
+                    if not prefix:
+                        self.line_count += 1
+                self._cond.notify_all()
+        stream.close()
+
+    def _reap(self):
+        # Waits for the child and both readers, then closes the log file
+        self.process.wait()
+        for reader in self._readers:
+            reader.join()
+        usage = self.cgroup.collect() if self.cgroup is not None else None
+        with self._cond:
+            self.usage = usage
+            self.returncode = self.process.returncode
+            self.finished_at = time.time()
+            self._log_file.close()
+            if self.trace is not None:
+                self.trace.usage = usage
+                self.trace.exited(self.returncode, stopped=self.stopped)
+            self._cond.notify_all()
+        for callback in self._on_done:
+            callback(self)
+
+    def on_done(self, callback):
+        """Registers `callback(runner)` to run on the reaper thread once all output is on disk. Call before start()."""
+        self._on_done.append(callback)
+
+    # --- QUERIES ---
+    @property
+    def done(self):
+        return self.returncode is not None
+
+    def wait_for_output(self, seen, timeout=None):
+        """
+        Blocks until more than `seen` stdout lines exist or the run is over.
+        Returns the current stdout line count.
+        """
+        with self._cond:
+            self._cond.wait_for(lambda: self.line_count > seen or self.done, timeout=timeout)
+            return self.line_count
+
+    def wait(self, timeout=None):
+        """Blocks until the process has exited and its output is fully drained."""
+        with self._cond:
+            self._cond.wait_for(lambda: self.done, timeout=timeout)
+        return self.returncode
+
+    def tail(self, n=20, stream="stdout"):
+        """Returns the last `n` lines of a stream as a list."""
+        source = self.stdout_tail if stream == "stdout" else self.stderr_tail
+        with self._cond:
+            lines = list(source)
+        return lines[-n:]
+
+    def flush_log(self):
+        """Pushes output drained so far from the write buffer into the spilled log, for viewers of a live run."""
+        with self._cond:
+            if self._log_file is not None and not self._log_file.closed:
+                self._log_file.flush()
+
+    def terminate(self):
+        if self.process and self.process.poll() is None:
+            self.process.terminate()
+
+
+# --- SPILLED LOG ACCESS ---
+# Byte offset of every LINE_INDEX_STEP-th line, so paging through a huge log
+# never has to read it from the start
+LINE_INDEX_STEP = 1000
+_line_indexes = {}
+_line_indexes_lock = threading.Lock()
+
+
+def index_log(path):
+    """
+    Returns (line_count, offsets) for a spilled log file.
+    The index is cached per path and only the newly appended part of a
+    growing file is scanned on the next call.
+    """
+    size = os.path.getsize(path)
+    with _line_indexes_lock:
+        scanned, count, offsets = _line_indexes.get(path, (0, 0, [0]))
+        if size < scanned:
+            # The file was replaced, start over
+            scanned, count, offsets = 0, 0, [0]
+        if size > scanned:
+            with open(path, "rb") as f:
+                f.seek(scanned)
+                for raw in f:
+                    if not raw.endswith(b"\n"):
+                        break  # Partial last line, pick it up next time
+                    scanned += len(raw)
+                    count += 1
+                    if count % LINE_INDEX_STEP == 0:
+                        offsets.append(scanned)
+            _line_indexes[path] = (scanned, count, offsets)
+        return count, list(offsets)
+
+
+def read_log_lines(path, start, count):
+    """Reads `count` lines of a spilled log file starting at line number `start`."""
+    _, offsets = index_log(path)
+    block = min(start // LINE_INDEX_STEP, len(offsets) - 1)
+    lines = []
+    with open(path, "rb") as f:
+        f.seek(offsets[block])
+        skip = start - block * LINE_INDEX_STEP
+        for raw in f:
+            if skip:
+                skip -= 1
+                continue
+            lines.append(raw.decode("utf-8", errors="replace").rstrip("\n"))
+            if len(lines) >= count:
+                break
+    return lines
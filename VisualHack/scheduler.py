@@ -0,0 +1,165 @@
+import itertools
+import os
+import threading
+import time
+
+# Total number of tools allowed to run at once on this box
+GLOBAL_LIMIT = int(os.environ.get("VISUALHACK_MAX_JOBS", max(2, os.cpu_count() or 1)))
+
+# Long-lived helpers (servers, listeners, poisoning) mostly sit idle, they get their own cap
+# instead of taking scan slots from the whole class for up to an hour
+HELPER_LIMIT = int(os.environ.get("VISUALHACK_MAX_HELPERS", 16))
+
+# Per-tool caps, tools not listed here are only bound by GLOBAL_LIMIT.
+# Override with e.g. VISUALHACK_TOOL_LIMITS="nmap=3,hping3=1"
+TOOL_LIMITS = {
+    "nmap": 2,
+    "hping3": 1,
+    "tshark": 2,
+    "aircrack-ng": 1,
+    "airodump-ng": 1,
+    "aireplay-ng": 1,
+    "ettercap": 1,
+}
+
+
+def _tool_limits_from_env():
+    limits = dict(TOOL_LIMITS)
+    for item in os.environ.get("VISUALHACK_TOOL_LIMITS", "").split(","):
+        name, _, value = item.partition("=")
+        if name.strip() and value.strip().isdigit():
+            limits[name.strip()] = int(value)
+    return limits
+
+
+class Ticket:
+    """A request to run one tool, queued until the scheduler grants it."""
+
+    def __init__(self, seq, tool, session_id, resources, helper=False):
+        self.seq = seq
+        self.tool = tool
+        self.session_id = session_id
+        self.resources = tuple(resources)
+        self.helper = helper
+        self.enqueued_at = time.time()
+        self.granted_at = None
+        self.released = False
+
+    @property
+    def granted(self):
+        return self.granted_at is not None
+
+    @property
+    def waited(self):
+        return (self.granted_at or time.time()) - self.enqueued_at
+
+
+class Scheduler:
+    """
+    Central admission control for every tool started from the dashboard.
+
+    A ticket is granted when the global and per-tool caps allow it and every
+    resource it names (e.g. a monitor interface) is free or already held by the
+    same session. Among waiting tickets, sessions with fewer running tools go
+    first, so one student queueing ten scans cannot starve the others.
+    Helper jobs count against `helper_limit` instead of the global cap.
+
+    Args:
+        global_limit (int): Maximum number of granted tickets, helpers aside.
+        tool_limits (dict): Maximum number of granted tickets per tool name.
+        helper_limit (int): Maximum number of granted helper tickets.
+    """
+
+    def __init__(self, global_limit=GLOBAL_LIMIT, tool_limits=None, helper_limit=HELPER_LIMIT):
+        self.global_limit = global_limit
+        self.helper_limit = helper_limit
+        self.tool_limits = _tool_limits_from_env() if tool_limits is None else tool_limits
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._waiting = []
+        self._running = []
+        # resource name -> [session_id, number of tickets holding it]
+        self._owners = {}
+
+    # --- QUEUE ---
+    def submit(self, tool, session_id, resources=(), helper=False):
+        """Queues a ticket and grants it immediately if there is room. `helper` marks a long-lived, mostly idle job."""
+        with self._cond:
+            ticket = Ticket(next(self._seq), tool, session_id, resources, helper)
+            self._waiting.append(ticket)
+            self._dispatch()
+            return ticket
+
+    def wait(self, ticket, timeout=None):
+        """Blocks until the ticket is granted. Returns False on timeout."""
+        with self._cond:
+            return self._cond.wait_for(lambda: ticket.granted, timeout=timeout)
+
+    def release(self, ticket):
+        """Gives the slot back, or drops the ticket from the queue if it never ran."""
+        with self._cond:
+            if ticket.released:
+                return
+            ticket.released = True
+            if ticket in self._waiting:
+                self._waiting.remove(ticket)
+            elif ticket in self._running:
+                self._running.remove(ticket)
+                for resource in ticket.resources:
+                    owner = self._owners[resource]
+                    owner[1] -= 1
+                    if owner[1] == 0:
+                        del self._owners[resource]
+            self._dispatch()
+
+    # --- QUERIES ---
+    def position(self, ticket):
+        """1-based place of a waiting ticket in the fair order, 0 once granted."""
+        with self._cond:
+            if ticket.granted:
+                return 0
+            order = self._fair_order()
+            return order.index(ticket) + 1 if ticket in order else 0
+
+    def snapshot(self):
+        """Returns (running, waiting) ticket lists, waiting in fair order."""
+        with self._cond:
+            return list(self._running), self._fair_order()
+
+    # --- INTERNALS ---
+    def _fair_order(self):
+        per_session = {}
+        for ticket in self._running:
+            if ticket.helper:
+                continue
+            per_session[ticket.session_id] = per_session.get(ticket.session_id, 0) + 1
+        return sorted(self._waiting, key=lambda t: (per_session.get(t.session_id, 0), t.seq))
+
+    def _can_grant(self, ticket):
+        running = sum(1 for t in self._running if t.helper == ticket.helper)
+        if running >= (self.helper_limit if ticket.helper else self.global_limit):
+            return False
+        limit = self.tool_limits.get(ticket.tool)
+        if limit is not None and sum(1 for t in self._running if t.tool == ticket.tool) >= limit:
+            return False
+        for resource in ticket.resources:
+            owner = self._owners.get(resource)
+            if owner is not None and owner[0] != ticket.session_id:
+                return False
+        return True
+
+    def _dispatch(self):
+        # Grant one ticket at a time, the fair order changes after every grant
+        granted = True
+        while granted:
+            granted = False
+            for ticket in self._fair_order():
+                if self._can_grant(ticket):
+                    self._waiting.remove(ticket)
+                    self._running.append(ticket)
+                    ticket.granted_at = time.time()
+                    for resource in ticket.resources:
+                        self._owners.setdefault(resource, [ticket.session_id, 0])[1] += 1
+                    granted = True
+                    break
+        self._cond.notify_all()
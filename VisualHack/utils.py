@@ -1,54 +1,516 @@
-import subprocess
+import collections
+import contextlib
+import os
+import time
 import streamlit as st
 import shlex
+from streamlit import runtime
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+from runner import ProcessRunner, index_log, read_log_lines
+from jobs import JobSupervisor
+from scheduler import Scheduler
+from history import RunStore, read_archived_log, run_status
+from artifacts import ArtifactStore
+from environment import Environment
+from metrics import MetricsRegistry, RunTrace
+from cgroups import CgroupManager, format_usage
 
-def run_command(command_list):
+
+class LiveLog:
+    """
+    A live code block showing the tail of a tool's output.
+    Lines can arrive as fast as the tool writes them, but the block is redrawn
+    at most `max_fps` times per second and only when something changed.
+    Lines that scrolled out of the window between two redraws are counted as dropped.
+    Args:
+        lines (int): How many of the latest lines stay visible.
+        language (str): Syntax highlighting for st.code.
+        max_fps (float): Upper bound on redraws per second.
+    """
+
+    def __init__(self, lines=20, language="bash", max_fps=4):
+        self.placeholder = st.empty()
+        self.window = collections.deque(maxlen=lines)
+        self.language = language
+        self.interval = 1.0 / max_fps
+        self.total = 0
+        self.dropped = 0
+        self.renders = 0
+        self._pending = 0
+        self._last_render = 0.0
+
+    def push(self, line):
+        """Adds one line and redraws if the time budget allows it."""
+        self.window.append(line)
+        self.total += 1
+        self._pending += 1
+        self.render()
+
+    def sync(self, tail, total, redraw=False):
+        """
+        Replaces the window with `tail` when the caller already keeps its own buffer of `total` lines.
+        Call it on every tick, also without new lines, so lines held back by the throttle get drawn.
+        `redraw` draws the window even when nothing changed, e.g. into a new placeholder after a fragment rerun.
+        """
+        if total != self.total:
+            self._pending += total - self.total
+            self.total = total
+            self.window.clear()
+            self.window.extend(tail)
+        if not self.render() and redraw:
+            self._draw()
+
+    def next_render_in(self):
+        """Seconds until the throttle allows the next redraw."""
+        return max(0.0, self._last_render + self.interval - time.monotonic())
+
+    def render(self, force=False):
+        """Redraws the block if there are new lines and the last redraw is old enough. Returns whether it did."""
+        if not self._pending:
+            return False
+        now = time.monotonic()
+        if not force and now - self._last_render < self.interval:
+            return False
+        self.dropped += max(0, self._pending - self.window.maxlen)
+        self._pending = 0
+        self._last_render = now
+        self.renders += 1
+        self._draw()
+        return True
+
+    def _draw(self):
+        with self.placeholder.container():
+            st.code("\n".join(self.window), language=self.language)
+            if self.dropped:
+                st.caption(f"⏩ {self.dropped} of {self.total} lines scrolled past between refreshes")
+
+    def flush(self):
+        """Draws whatever is still pending, call this once the stream has ended."""
+        self.render(force=True)
+
+
+@st.fragment
+def log_viewer(log_path, page_size=200, run_id=None):
+    """
+    Pages through a spilled log file, newest page first.
+    Runs as a fragment so scrolling back does not rerun the page or its tools.
+    Once the spill has been evicted, the copy archived for `run_id` is shown instead.
+    """
+    if not os.path.exists(log_path):
+        run = get_run_store().get(run_id) if run_id is not None else None
+        if not run or not run["log_path"] or not os.path.exists(run["log_path"]):
+            st.warning("The log of this run has been removed.")
+            return
+        start = st.number_input("Start at line", min_value=0, value=0, step=page_size, key=f"{log_path}_start")
+        st.caption(f"Archived copy · `{run['log_path']}`")
+        st.code("\n".join(read_archived_log(run["log_path"], start, page_size)))
+        return
+
+    total, _ = index_log(log_path)
+    pages = max(1, -(-total // page_size))
+
+    c1, c2 = st.columns([3, 1])
+    with c2:
+        paused = st.toggle("⏸ Pause", key=f"{log_path}_paused", help="Freeze the view while the log keeps growing")
+    if paused and f"{log_path}_frozen" in st.session_state:
+        total, pages = st.session_state[f"{log_path}_frozen"]
+    else:
+        st.session_state[f"{log_path}_frozen"] = (total, pages)
+
+    with c1:
+        page = st.number_input(f"Page (1 = newest, {pages} total)", 1, pages, 1, key=f"{log_path}_page")
+
+    end = total - (page - 1) * page_size
+    start = max(0, end - page_size)
+    st.caption(f"Lines {start + 1}-{end} of {total} · `{log_path}`")
+    st.code("\n".join(read_log_lines(log_path, start, end - start)))
+
+
+def run_command(command_list, background=False, key=None, max_runtime=None, resources=()):
     """
     Executes a system command and streams the output to Streamlit.
+    Stdout and stderr are drained in the background, only the latest lines stay
+    in memory and the complete output is spilled to a log file.
     Args:
         command_list (list): A list of strings, e.g., ["nmap", "-sV", "192.168.1.1"]
+        background (bool): Return right away with a handle instead of blocking the page.
+            Pair it with command_monitor(key) so the page can follow and stop the run.
+        key (str): Name of the background run in this session, defaults to the tool name.
+        max_runtime (float): Wall-clock limit in seconds for a background run.
+        resources (tuple): Shared resources the run needs from the scheduler, e.g. ("iface:wlan1",).
     """
+    if background:
+        return _start_background(command_list, key or command_list[0], max_runtime, resources)
+
     # Create a placeholder for real-time logs
     output_container = st.empty()
-    full_output = []
 
+    # The runner confines and collects the process itself
+    with traced(command_list, kind="command", confine=False) as trace:
+        try:
+            with scheduled(command_list[0], resources) as ticket:
+                trace.queued(ticket)
+                cgroup = get_cgroups().create(trace.tool)
+                runner = _start_tracked(ProcessRunner(command_list, trace=trace, cgroup=cgroup), "command")
+                try:
+                    trace.renders = _stream_until_done(runner, output_container)
+                except BaseException:
+                    # A rerun or st.stop() leaves nobody to follow or cap the tool, its drain threads would keep it alive
+                    runner.stopped = True
+                    runner.terminate()
+                    raise
+            _show_result(runner)
+
+        except FileNotFoundError:
+            trace.error = "not found"
+            st.error(f"❌ Error: The tool '{command_list[0]}' is not installed or not found in PATH.")
+        except Exception as e:
+            trace.error = str(e)
+            st.error(f"❌ An unexpected error occurred: {str(e)}")
+
+
+def _stream_until_done(runner, output_container):
+    # Sync the throttled log view with the runner's ring buffer, returns how often it was redrawn
+    with output_container.container():
+        st.info(f"🚀 Executing: {' '.join(runner.command_list)}")
+        live_log = LiveLog(lines=20)
+
+        seen = 0
+        while not runner.done:
+            # Wake on the first new line, then sleep until the next redraw is due, so the
+            # loop runs at the redraw rate however fast the tool writes
+            runner.wait_for_output(seen, timeout=live_log.interval)
+            runner.wait(timeout=live_log.next_render_in())
+            seen = runner.line_count
+            live_log.sync(runner.tail(20), seen)
+        live_log.flush()
+
+    # Wait for process to finish
+    runner.wait()
+    return live_log.renders
+
+
+def _show_result(runner):
+    if runner.returncode == 0:
+        st.success("✅ Attack/Scan Completed Successfully")
+        # Scroll back through the spilled log in an expander
+        with st.expander("View Full Log"):
+            log_viewer(runner.log_path, run_id=runner.run_id)
+    elif runner.stopped:
+        st.warning("🛑 Stopped before it finished.")
+        with st.expander("View Full Log"):
+            log_viewer(runner.log_path, run_id=runner.run_id)
+    else:
+        st.error(f"❌ Process failed with return code {runner.returncode}")
+        st.error("\n".join(runner.tail(50, stream="stderr")))
+    # Read back from the run's cgroup, empty when it ran unconfined
+    usage = format_usage(runner.usage)
+    if usage:
+        st.caption(f"🧱 {usage}")
+
+
+# --- ARTIFACTS ---
+@st.cache_resource
+def get_artifact_store():
+    """The process-wide ArtifactStore holding every file the modules produce."""
+    return ArtifactStore()
+
+
+# --- RUN HISTORY ---
+@st.cache_resource
+def get_run_store():
+    """The process-wide RunStore that records every run in SQLite."""
+    return RunStore(get_artifact_store())
+
+
+def _run_status(runner):
+    return run_status(runner.returncode, runner.stopped)
+
+
+def _start_tracked(runner, kind, **popen_kwargs):
+    """Starts a ProcessRunner and records it in the run history, including its log once it ends."""
+    store = get_run_store()
+    runner.run_id = store.start_run(runner.command_list, current_session_id(), kind)
+    runner.on_done(lambda r: store.finish_run(r.run_id, r.returncode, _run_status(r), r.log_path, r.usage))
     try:
-        # Popen allows us to read stdout in real-time
-        process = subprocess.Popen(
-            command_list,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,
-            bufsize=1,
-            universal_newlines=True
+        return runner.start(**popen_kwargs)
+    except BaseException:
+        store.finish_run(runner.run_id, None, "failed")
+        raise
+
+
+# --- BACKGROUND RUNS ---
+def _start_background(command_list, key, max_runtime, resources=()):
+    runs = st.session_state.setdefault("background_runs", {})
+    previous = runs.get(key)
+    if previous is not None and not previous.done:
+        st.warning("⏳ This command is already running, stop it first.")
+        return previous
+
+    metrics = get_metrics()
+    trace = RunTrace(command_list, kind="background")
+    ticket = acquire_slot(command_list[0], resources)
+    trace.queued(ticket)
+    runner = ProcessRunner(command_list, trace=trace, cgroup=get_cgroups().create(trace.tool))
+    runner.on_done(lambda r: metrics.record(r.trace))
+    try:
+        # Own process group so Stop can take down the tool and its children
+        _start_tracked(runner, "background", start_new_session=True)
+        trace.unblocked()
+        runner.job_id = get_supervisor().adopt(
+            " ".join(command_list), runner.process,
+            session_id=current_session_id(),
+            max_runtime=max_runtime,
+            on_exit=lambda job: get_scheduler().release(ticket),
+            # Stops from the Jobs page or the time limit count as stopped, not failed
+            on_stop=lambda job: setattr(runner, "stopped", True)
         )
+    except BaseException as e:
+        # Nothing owns the slot until the supervisor adopted the process
+        get_scheduler().release(ticket)
+        if runner.process is not None:
+            runner.terminate()
+        if not isinstance(e, Exception):
+            raise
+        trace.error = "not found" if isinstance(e, FileNotFoundError) else str(e)
+        if runner.process is None:
+            trace.unblocked()
+            metrics.record(trace)
+        if isinstance(e, FileNotFoundError):
+            st.error(f"❌ Error: The tool '{command_list[0]}' is not installed or not found in PATH.")
+        else:
+            st.error(f"❌ An unexpected error occurred: {str(e)}")
+        return None
+
+    runs[key] = runner
+    return runner
 
-        # Iterate over output lines as they are generated
-        with output_container.container():
-            st.info(f"🚀 Executing: {' '.join(command_list)}")
-            code_block = st.empty()
-            
-            for line in process.stdout:
-                line = line.strip()
-                if line:
-                    full_output.append(line)
-                    # Update the code block with the latest 20 lines to keep it readable
-                    code_block.code("\n".join(full_output[-20:]), language="bash")
-
-        # Wait for process to finish
-        process.wait()
-        
-        if process.returncode == 0:
-            st.success("✅ Attack/Scan Completed Successfully")
-            # Show full log in an expander
-            with st.expander("View Full Log"):
-                st.code("\n".join(full_output))
+
+def stop_command(key):
+    """Terminates the process group of a background run started with run_command(..., background=True)."""
+    runner = st.session_state.get("background_runs", {}).get(key)
+    if runner is not None and not runner.done:
+        # The supervisor marks the runner as stopped through its on_stop hook
+        get_supervisor().stop(runner.job_id)
+
+
+def command_monitor(key, poll_interval=1.0, extra=None, transform=None):
+    """
+    Shows the progress of a background run, a Stop button and scroll-back over its full output.
+    While the run is alive only this part of the page refreshes, every `poll_interval` seconds.
+    Args:
+        extra (callable): Called with the runner on every refresh, e.g. to render parsed results.
+        transform (callable): Applied to each line of the live tail before it is shown.
+    """
+    runner = st.session_state.get("background_runs", {}).get(key)
+    if runner is None:
+        return
+    if runner.done:
+        _monitor_body(key, extra, transform)
+    else:
+        st.fragment(_monitor_body, run_every=poll_interval)(key, extra, transform)
+
+
+def _monitor_body(key, extra=None, transform=None):
+    runner = st.session_state["background_runs"][key]
+    runner.trace.renders += 1
+    st.info(f"🚀 Executing: {' '.join(runner.command_list)}")
+
+    if not runner.done:
+        c1, c2 = st.columns([4, 1])
+        with c1:
+            st.caption(f"⏳ Running for {int(time.time() - runner.started_at)}s · {runner.line_count} lines")
+        with c2:
+            if st.button("🛑 Stop", key=f"{key}_stop"):
+                stop_command(key)
+        # The widget is kept per run so lines that scrolled past between two refreshes are counted
+        run_id, live_log = st.session_state.get(f"{key}_live_log", (None, None))
+        if live_log is None or run_id != runner.run_id:
+            live_log = LiveLog(lines=20)
+            st.session_state[f"{key}_live_log"] = (runner.run_id, live_log)
         else:
-            stderr = process.stderr.read()
-            st.error(f"❌ Process failed with return code {process.returncode}")
-            st.error(stderr)
-
-    except FileNotFoundError:
-        st.error(f"❌ Error: The tool '{command_list[0]}' is not installed or not found in PATH.")
-    except Exception as e:
-        st.error(f"❌ An unexpected error occurred: {str(e)}")
+            live_log.placeholder = st.empty()
+        lines = runner.tail(20)
+        live_log.sync(list(map(transform, lines)) if transform else lines, runner.line_count, redraw=True)
+        # The scroll-back has its own Pause, which holds it still while the log keeps growing
+        with st.expander("📜 Scroll Back"):
+            runner.flush_log()
+            log_viewer(runner.log_path, run_id=runner.run_id)
+
+    if extra is not None:
+        extra(runner)
+
+    if runner.done:
+        if st.session_state.get(f"{key}_polling"):
+            # Finished while polling, one full rerun drops the auto-refresh
+            st.session_state[f"{key}_polling"] = False
+            st.rerun()
+        _show_result(runner)
+    else:
+        st.session_state[f"{key}_polling"] = True
+
+
+# --- BACKGROUND JOBS ---
+def current_session_id():
+    """Returns the id of the browser session running this script."""
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx else None
+
+
+def _session_alive(session_id):
+    return runtime.exists() and runtime.get_instance().is_active_session(session_id)
+
+
+@st.cache_resource
+def get_supervisor():
+    """The process-wide JobSupervisor shared by every session."""
+    return JobSupervisor(is_session_alive=_session_alive)
+
+
+def launch_job(name, command_list, max_runtime=None, resources=(), cleanup=None, **popen_kwargs):
+    """
+    Queues for a helper slot, then starts a detached job under the supervisor.
+    The slot (and any resource lock) is held until the job ends, it does not take one of the global slots.
+    Returns the job id.
+    """
+    metrics = get_metrics()
+    trace = RunTrace(command_list, kind="job")
+    ticket = acquire_slot(command_list[0], resources, helper=True)
+    trace.queued(ticket)
+    store = get_run_store()
+    run_id = store.start_run(command_list, current_session_id(), kind="job")
+
+    def on_exit(job):
+        get_scheduler().release(ticket)
+        stopped = job.reason != "exited"
+        store.finish_run(run_id, job.returncode, run_status(job.returncode, stopped), usage=job.usage)
+        trace.usage = job.usage
+        trace.spawn_ns = job.spawn_ns
+        trace.duration_ns = int(job.runtime * 1e9)
+        trace.exited(job.returncode, stopped=stopped)
+        metrics.record(trace)
+
+    try:
+        job_id = get_supervisor().launch(
+            name, command_list,
+            session_id=current_session_id(),
+            max_runtime=max_runtime,
+            cleanup=cleanup,
+            on_exit=on_exit,
+            cgroup=get_cgroups().create(trace.tool),
+            **popen_kwargs
+        )
+    except BaseException as e:
+        get_scheduler().release(ticket)
+        store.finish_run(run_id, None, "failed")
+        trace.error = str(e) or type(e).__name__
+        trace.unblocked()
+        metrics.record(trace)
+        raise
+    trace.unblocked()
+    return job_id
+
+
+# --- SCHEDULING ---
+@st.cache_resource
+def get_scheduler():
+    """The process-wide Scheduler that caps how many tools run at once."""
+    return Scheduler()
+
+
+def acquire_slot(tool, resources=(), helper=False):
+    """
+    Waits for the scheduler to grant `tool` a slot, showing the queue position meanwhile.
+    Args:
+        tool (str): Tool name the per-tool caps are looked up by.
+        resources (tuple): Shared resources this run needs exclusively, e.g. ("iface:wlan1mon",).
+        helper (bool): A long-lived job, counted against the helper cap instead of the global one.
+    """
+    scheduler = get_scheduler()
+    ticket = scheduler.submit(os.path.basename(tool), current_session_id(), resources, helper)
+    if scheduler.wait(ticket, timeout=0):
+        return ticket
+
+    status = st.empty()
+    try:
+        while not scheduler.wait(ticket, timeout=0.5):
+            status.info(f"🕒 Queued for {ticket.tool}: position {scheduler.position(ticket)}, waiting {int(ticket.waited)}s")
+    except BaseException:
+        # The user left the page or clicked something else while queued
+        scheduler.release(ticket)
+        raise
+    status.empty()
+    return ticket
+
+
+@contextlib.contextmanager
+def scheduled(tool, resources=()):
+    """Holds a scheduler slot for the duration of a with block."""
+    ticket = acquire_slot(tool, resources)
+    try:
+        yield ticket
+    finally:
+        get_scheduler().release(ticket)
+
+
+# --- ENVIRONMENT ---
+@st.cache_resource
+def get_environment():
+    """The process-wide Environment caching tool lookups, root status, interfaces and the local IP."""
+    return Environment()
+
+
+def page_startup(page, started):
+    """
+    Records how long a page took from `started` (a perf_counter value taken at its top)
+    through its imports and environment checks, and shows it in the sidebar.
+    Args:
+        page (str): Name the timing is listed under in the status panel.
+        started (float): time.perf_counter() at the start of the page script.
+    """
+    elapsed = time.perf_counter() - started
+    get_environment().record_startup(page, elapsed)
+    st.sidebar.caption(f"⏱️ Page startup: {elapsed * 1000:.1f} ms")
+
+
+# --- RESOURCE LIMITS ---
+@st.cache_resource
+def get_cgroups():
+    """The process-wide CgroupManager that gives every spawned tool its own limited cgroup."""
+    return CgroupManager()
+
+
+# --- METRICS ---
+@st.cache_resource
+def get_metrics():
+    """The process-wide MetricsRegistry that collects run timings and writes the scrape files."""
+    return MetricsRegistry()
+
+
+@contextlib.contextmanager
+def traced(command_list, kind="page", confine=True):
+    """
+    Records a RunTrace for a process started inside the with block.
+    The block fills in spawn time, output and exit code, the time the script
+    thread spent inside it is recorded as blocked time.
+    The block must spawn `trace.command`, which runs the tool in its own cgroup
+    when they are available. Its usage is read back when the block ends.
+    Args:
+        command_list (list): The command being run.
+        kind (str): Shown next to the run on the Metrics page.
+        confine (bool): False when the caller places the process in a cgroup itself.
+    """
+    trace = RunTrace(command_list, kind)
+    cgroup = get_cgroups().create(trace.tool) if confine else None
+    if cgroup is not None:
+        trace.command = cgroup.argv(command_list)
+    try:
+        yield trace
+    except BaseException as e:
+        trace.error = trace.error or str(e) or type(e).__name__
+        raise
+    finally:
+        if cgroup is not None:
+            trace.usage = cgroup.collect()
+        trace.unblocked()
+        get_metrics().record(trace)